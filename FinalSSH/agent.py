@@ -10,29 +10,143 @@ QuizAgent wraps a tool registry and exposes two ways to invoke tools:
   1.  agent.call(tool_name, **kwargs)
       Direct invocation — bypasses the LLM orchestrator entirely.
       Used by Flask routes for reliable, structured outputs.
+      agent.submit(...) returns a Future instead; await agent.acall(...)
+      is the asyncio form.
 
   2.  agent.run(task, system, max_turns)
       Full LLM-orchestrated agent loop using llama-3.3-70b-versatile.
       The orchestrator decides which tools to call and in what order.
       Use this for complex, multi-step tasks or future workflow expansion.
+      await agent.arun(...) is the async, streaming equivalent.
 
 Adding a new tool
 ─────────────────
     from tools.my_tool import create_my_tool
-    agent.register(create_my_tool(groq_client))
+    agent.register(create_my_tool(groq_client))   # or register(tool_a, tool_b, ...)
     # Done — the tool is now available for both agent.call() and agent.run()
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-from typing import Any
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Hashable
 
-from tools import Tool
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
+from groq.types.chat import ChatCompletionMessageToolCall
+from groq.types.chat.chat_completion_message_tool_call import Function
+
+from cache import MISSING, TTLCache
+from throttle import LLM_GATE
+from tools import Tool, compile_validator
 
 logger = logging.getLogger(__name__)
 
+# Connection pool for Groq HTTPS traffic.  A longer keep-alive than the SDK
+# default (5 s) keeps the socket warm between user actions and across the
+# turns of run(), so turns 2..N skip the TCP + TLS handshake.  Up to 50 idle
+# sockets are kept (SDK default: 20) so a burst of gated calls
+# (GROQ_MAX_CONCURRENCY, default 20) plus prefetch work all find a warm one.
+GROQ_HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=50,
+    keepalive_expiry=30,
+)
+
+# Retries the SDK makes on 429, 5xx, timeouts and dropped connections, with
+# exponential backoff and jitter (honouring Retry-After) — for every call
+# site, streamed or not.  A retry waits inside its LLM_GATE slot, so other
+# requests keep flowing on the remaining slots.
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+
+
+def build_groq_client(**kwargs: Any) -> Groq:
+    """
+    Build a Groq client on a pooled keep-alive HTTP connection.
+    Extra keyword arguments are forwarded to groq.Groq (e.g. api_key).
+    """
+    kwargs.setdefault("max_retries", GROQ_MAX_RETRIES)
+    return Groq(http_client=DefaultHttpxClient(limits=GROQ_HTTP_LIMITS), **kwargs)
+
+
+def build_async_groq_client(**kwargs: Any) -> AsyncGroq:
+    """Async counterpart of build_groq_client(), used by QuizAgent.arun."""
+    kwargs.setdefault("max_retries", GROQ_MAX_RETRIES)
+    return AsyncGroq(http_client=DefaultAsyncHttpxClient(limits=GROQ_HTTP_LIMITS), **kwargs)
+
+
+# json.dumps() builds a fresh JSONEncoder whenever non-default options are
+# passed; reuse one configured instance for tool results instead.
+_encode_tool_result = json.JSONEncoder(ensure_ascii=False).encode
+
+# Shared worker pool for running independent tool calls concurrently.  Its
+# threads mostly wait on Groq, so it is as wide as the LLM gate: fan-outs
+# (batch evaluation, prefetch) are limited by the gate, not by the pool.
+_TOOL_POOL = ThreadPoolExecutor(
+    max_workers=LLM_GATE.max_concurrency, thread_name_prefix="quiz-tool",
+)
+
+
+class ToolArgumentError(ValueError):
+    """Arguments passed to QuizAgent.call() do not match the tool's schema."""
+
+
+def _exact_cache_key(kwargs: dict) -> str:
+    """Default response-cache key: the canonical JSON of the arguments."""
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _gated(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a tool so each invocation (one LLM round-trip) runs under the LLM gate."""
+    def run(**kwargs: Any) -> Any:
+        with LLM_GATE.slot():
+            return func(**kwargs)
+    return run
+
+DEFAULT_RUN_SYSTEM = (
+    "You are a helpful quiz assistant. "
+    "Use the available tools to complete the task precisely. "
+    "When a tool returns a result, relay it verbatim without adding extra commentary."
+)
+
+# JSON-Schema keys the orchestrator never needs — dropped to save prompt tokens.
+_SCHEMA_NOISE_KEYS = frozenset({"title", "default", "examples", "$schema", "$comment"})
+
+
+def _minify_schema(node: Any) -> Any:
+    """
+    Return a compact copy of a JSON-Schema fragment for the orchestrator.
+
+    Drops documentation-only keys, empty `required` lists and the
+    `additionalProperties: true` default, and collapses runs of whitespace
+    in description strings.  The source schema is never mutated.
+    """
+    if isinstance(node, dict):
+        out: dict = {}
+        for key, value in node.items():
+            if key in _SCHEMA_NOISE_KEYS:
+                continue
+            if key == "required" and not value:
+                continue
+            if key == "additionalProperties" and value is True:
+                continue
+            if key == "description" and isinstance(value, str):
+                out[key] = " ".join(value.split())
+            elif key == "properties" and isinstance(value, dict):
+                # Property names are user data, not schema keywords — keep them all.
+                out[key] = {name: _minify_schema(sub) for name, sub in value.items()}
+            else:
+                out[key] = _minify_schema(value)
+        return out
+    if isinstance(node, list):
+        return [_minify_schema(item) for item in node]
+    return node
+
 
 class QuizAgent:
     """
@@ -40,25 +154,79 @@ class QuizAgent:
     them either directly (agent.call) or via an LLM (agent.run).
     """
 
+    __slots__ = (
+        "_client", "_async_client", "_registry", "_funcs", "_cache_keys",
+        "_timeouts", "_validators", "_schemas_cache", "_summary_cache", "_call_cache",
+    )
+
     # Model used for the LLM orchestration loop.
     # llama-3.3-70b-versatile supports Groq's tool-calling API natively.
     ORCHESTRATOR_MODEL = "llama-3.3-70b-versatile"
 
-    def __init__(self, groq_client) -> None:
-        self._client = groq_client
+    # Registries larger than this use two-phase schema loading in run():
+    # only compact summaries are resident, full schemas are promoted on demand.
+    LAZY_SCHEMA_THRESHOLD = 8
+
+    # Response cache for Tool.cacheable tools in call(): size and lifetime (s).
+    CALL_CACHE_SIZE = 1000
+    CALL_CACHE_TTL  = 60.0
+
+    # Seconds run() waits for a tool result unless the Tool sets its own timeout.
+    TOOL_TIMEOUT = 60.0
+
+    # Once the history's message content exceeds this many characters, older
+    # tool results are replaced by a size stub; the newest few stay verbatim.
+    HISTORY_CHAR_BUDGET = 24_000
+    HISTORY_KEEP_TOOL_RESULTS = 2
+
+    def __init__(
+        self,
+        groq_client: Groq | None = None,
+        async_client: AsyncGroq | None = None,
+    ) -> None:
+        # Share one pooled client across agents where possible; build one only
+        # when the caller did not supply it.  The async client is only needed
+        # by arun() and is built on first use.
+        self._client = groq_client if groq_client is not None else build_groq_client()
+        self._async_client = async_client
         self._registry: dict[str, Tool] = {}
+        # Hot-path views of the registry, kept in sync by register():
+        # name → callable (wrapped in the LLM gate unless Tool.gates_itself),
+        # cacheable tool → its cache-key function,
+        # name → effective timeout.
+        self._funcs: dict[str, Callable[..., Any]] = {}
+        self._cache_keys: dict[str, Callable[[dict], Hashable]] = {}
+        self._timeouts: dict[str, float] = {}
+        # Argument validators compiled from each Tool.parameters at register().
+        self._validators: dict[str, Callable[[Any], None]] = {}
+        # Built lazily by _tool_schemas(); reset whenever the registry changes.
+        self._schemas_cache: list[dict] | None = None
+        self._summary_cache: str | None = None
+        self._call_cache = TTLCache(maxsize=self.CALL_CACHE_SIZE, ttl=self.CALL_CACHE_TTL)
 
     # ── Registration ───────────────────────────────────────────────────────────
 
-    def register(self, tool: Tool) -> "QuizAgent":
+    def register(self, *tools: Tool) -> "QuizAgent":
         """
-        Register a Tool object.  Returns self so calls can be chained:
-            agent.register(tool_a).register(tool_b)
+        Register one or more Tool objects.  Returns self so calls can be chained:
+            agent.register(tool_a, tool_b).register(tool_c)
         """
-        if tool.name in self._registry:
-            logger.warning("Tool '%s' is already registered — overwriting.", tool.name)
-        self._registry[tool.name] = tool
-        logger.info("Registered tool: %s", tool.name)
+        for tool in tools:
+            if tool.name in self._registry:
+                logger.warning("Tool '%s' is already registered — overwriting.", tool.name)
+            self._registry[tool.name] = tool
+            self._funcs[tool.name] = tool.func if tool.gates_itself else _gated(tool.func)
+            if tool.cacheable:
+                self._cache_keys[tool.name] = tool.cache_key or _exact_cache_key
+            else:
+                self._cache_keys.pop(tool.name, None)
+            self._timeouts[tool.name] = (
+                tool.timeout if tool.timeout is not None else self.TOOL_TIMEOUT
+            )
+            self._validators[tool.name] = compile_validator(tool.parameters)
+            logger.info("Registered tool: %s", tool.name)
+        self._schemas_cache = None
+        self._summary_cache = None
         return self
 
     def add_tool(
@@ -81,48 +249,218 @@ class QuizAgent:
 
     # ── Direct invocation ──────────────────────────────────────────────────────
 
-    def call(self, tool_name: str, **kwargs: Any) -> Any:
+    def call(self, tool_name: str, /, *, cache_skip: bool = False, **kwargs: Any) -> Any:
         """
         Invoke a registered tool directly by name (no LLM overhead).
 
         This is the primary method used by Flask routes for reliable,
         latency-predictable, structured output.
 
-        Raises ValueError if the tool is not registered.
+        Results of Tool.cacheable tools are memoised for CALL_CACHE_TTL
+        seconds, keyed by tool name and Tool.cache_key(arguments) (by default
+        the canonical JSON of the arguments).  The on_token callback is not
+        part of the key; a streamed call that hits the cache gets the result
+        without tokens.  cache_skip=True forces a fresh call, e.g. for a
+        regrade; its result still refreshes the cache.
+
+        Raises ValueError if the tool is not registered, ToolArgumentError
+        if the arguments do not match its parameter schema, and
+        throttle.LLMBusyError when no LLM slot frees up in time.  Cache hits
+        never wait for a slot.
         """
-        tool = self._registry.get(tool_name)
-        if tool is None:
+        func = self._funcs.get(tool_name)
+        if func is None:
             available = ", ".join(self._registry) or "(none)"
             raise ValueError(
                 f"Tool '{tool_name}' not registered. Available: {available}"
             )
-        logger.debug("Calling tool '%s' with args: %s", tool_name, list(kwargs))
-        return tool.func(**kwargs)
+        self.check_args(tool_name, kwargs)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Calling tool '%s' with args: %s", tool_name, list(kwargs))
+        cache_key = self._cache_keys.get(tool_name)
+        if cache_key is None:
+            return func(**kwargs)
+
+        # A streamed call's token callback is per-request plumbing, not input:
+        # leave it out of the key so streamed and plain calls share entries.
+        key_args = kwargs
+        if "on_token" in kwargs:
+            key_args = {k: v for k, v in kwargs.items() if k != "on_token"}
+        key = (tool_name, cache_key(key_args))
+        result = MISSING if cache_skip else self._call_cache.get(key)
+        if result is MISSING:
+            result = func(**kwargs)
+            # Never pin a failure: tools report soft errors as {"error": ...}.
+            if not (isinstance(result, dict) and "error" in result):
+                self._call_cache.set(key, result)
+        else:
+            logger.debug("Cache hit for tool '%s'.", tool_name)
+        return result
+
+    def check_args(self, tool_name: str, kwargs: dict) -> None:
+        """
+        Validate `kwargs` against a registered tool's parameter schema;
+        raises ToolArgumentError on the first mismatch.  Lets a caller reject
+        bad input up front, before work is handed to another thread.
+        """
+        try:
+            self._validators[tool_name](kwargs)
+        except ValueError as e:
+            raise ToolArgumentError(f"{tool_name}: {e}") from None
+
+    def submit(self, tool_name: str, /, **kwargs: Any) -> Future:
+        """
+        Start call(tool_name, **kwargs) on the shared tool pool and return its
+        Future, so a route can overlap the LLM round-trip with other work.
+        """
+        return _TOOL_POOL.submit(self.call, tool_name, **kwargs)
+
+    async def acall(self, tool_name: str, /, **kwargs: Any) -> Any:
+        """
+        Awaitable call(): the blocking tool runs on the shared tool pool and
+        the event loop stays free for other requests meanwhile.
+        """
+        return await asyncio.wrap_future(self.submit(tool_name, **kwargs))
 
     # ── LLM-orchestrated agent loop ────────────────────────────────────────────
 
     def _tool_schemas(self) -> list[dict]:
-        """Convert registered tools to Groq / OpenAI tool-calling schema."""
-        return [
+        """
+        Convert registered tools to Groq / OpenAI tool-calling schema.
+
+        Parameters are minified (see _minify_schema) to keep per-turn prompt
+        tokens down; the function envelope itself is required by Groq.
+        Tools are emitted sorted by name so the request prefix is
+        byte-identical across turns and agents, which lets the provider's
+        prompt cache hit.  The list is cached until the next register()/add_tool() call, so
+        callers must treat it as read-only.
+        """
+        if self._schemas_cache is not None:
+            return self._schemas_cache
+        self._schemas_cache = [
             {
                 "type": "function",
                 "function": {
                     "name": t.name,
-                    "description": t.description,
-                    "parameters": t.parameters,
+                    "description": " ".join(t.description.split()),
+                    "parameters": _minify_schema(t.parameters),
                 },
             }
-            for t in self._registry.values()
+            for t in sorted(self._registry.values(), key=lambda t: t.name)
         ]
+        return self._schemas_cache
+
+    def _summary_pool(self) -> str:
+        """
+        Compact one-line-per-tool summary (name + truncated description),
+        embedded in the system prompt when schemas are loaded lazily.
+        """
+        if self._summary_cache is None:
+            lines = [
+                f"- {t.name}: {' '.join(t.description.split())[:240]}"
+                for t in sorted(self._registry.values(), key=lambda t: t.name)
+            ]
+            self._summary_cache = (
+                "Available tools (name: description):\n" + "\n".join(lines) + "\n"
+                "Name the tool(s) you need; their full parameter schemas will then be provided."
+            )
+        return self._summary_cache
+
+    @staticmethod
+    def _log_cache_usage(resp: Any, turn: int) -> None:
+        """Debug-log how many prompt tokens the provider served from its cache."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        usage   = getattr(resp, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached  = getattr(details, "cached_tokens", None)
+        if cached is not None:
+            logger.debug(
+                "[turn %d] prompt cache: %s/%s tokens cached",
+                turn, cached, getattr(usage, "prompt_tokens", "?"),
+            )
+
+    def _parallel_safe(self, tc: Any) -> bool:
+        """True if this tool call may run concurrently with its siblings."""
+        tool = self._registry.get(tc.function.name)
+        return tool is None or tool.parallel_safe
+
+    def _dispatch_tool_call(self, tc: Any, turn: int) -> tuple[Future, float]:
+        """
+        Start one orchestrator tool call on the shared pool.
+        Returns the future and the timeout its result should be awaited with;
+        unknown tools and invalid arguments resolve immediately to an error
+        result the orchestrator can react to.
+        """
+        t_name = tc.function.name
+        t_args = json.loads(tc.function.arguments)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[turn %d] orchestrator → tool '%s' args=%s", turn, t_name, t_args
+            )
+
+        func = self._funcs.get(t_name)
+        error = None
+        if func is None:
+            error = f"Unknown tool: {t_name}"
+        else:
+            try:
+                self._validators[t_name](t_args)
+            except ValueError as exc:
+                error = f"Invalid arguments for {t_name}: {exc}"
+        if error is not None:
+            done: Future = Future()
+            done.set_result({"error": error})
+            return done, 0.0
+        return _TOOL_POOL.submit(func, **t_args), self._timeouts[t_name]
+
+    @staticmethod
+    def _collect_tool_call(tc: Any, future: Future, timeout: float) -> dict:
+        """Wait for a dispatched tool call and wrap its result as a tool message."""
+        t_name = tc.function.name
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning("Tool '%s' timed out after %.1fs.", t_name, timeout)
+            result = {"error": "tool timeout"}
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Tool '%s' raised an exception.", t_name)
+            result = {"error": str(exc)}
+
+        return {
+            "role": "tool",
+            "tool_call_id": tc.id,
+            "content": _encode_tool_result(result),
+        }
+
+    def _trim_history(self, messages: list) -> None:
+        """
+        Keep the per-turn prompt bounded: when the history's content exceeds
+        HISTORY_CHAR_BUDGET, stub out the oldest tool results in place.  The
+        system/user prefix is never touched, so provider prompt caching still
+        applies, and the newest HISTORY_KEEP_TOOL_RESULTS results are kept.
+        """
+        total = sum(len(m.get("content") or "") for m in messages if isinstance(m, dict))
+        if total <= self.HISTORY_CHAR_BUDGET:
+            return
+        tool_msgs = [m for m in messages if isinstance(m, dict) and m.get("role") == "tool"]
+        for m in tool_msgs[:-self.HISTORY_KEEP_TOOL_RESULTS or None]:
+            size = len(m["content"])
+            if m["content"].startswith("<truncated "):
+                continue
+            m["content"] = f"<truncated {size}B>"
+            total -= size - len(m["content"])
+            if total <= self.HISTORY_CHAR_BUDGET:
+                break
+
+    def _mentioned_tools(self, text: str) -> set[str]:
+        """Names of registered tools that appear verbatim in `text`."""
+        return {name for name in self._registry if name in text}
 
     def run(
         self,
         task: str,
-        system: str = (
-            "You are a helpful quiz assistant. "
-            "Use the available tools to complete the task precisely. "
-            "When a tool returns a result, relay it verbatim without adding extra commentary."
-        ),
+        system: str = DEFAULT_RUN_SYSTEM,
         max_turns: int = 6,
     ) -> str:
         """
@@ -132,70 +470,252 @@ class QuizAgent:
         which tools to call, executes them, observes results, and eventually
         produces a final text response.
 
+        With more than LAZY_SCHEMA_THRESHOLD tools registered, only a summary
+        pool is sent up front; a tool's full schema is promoted once the task
+        or the orchestrator names it.
+
         Parameters
         ----------
         task      : Natural-language task description.
         system    : System prompt for the orchestrator.
-        max_turns : Maximum number of LLM ↔ tool round-trips before giving up.
+        max_turns : Maximum number of LLM ↔ tool round-trips.  The last turn
+                    is sent with tool_choice="none" so the orchestrator always
+                    ends with a text answer.
 
         Returns
         -------
         str  — The orchestrator's final text response.
         """
+        all_schemas = self._tool_schemas()
+        lazy = len(all_schemas) > self.LAZY_SCHEMA_THRESHOLD
+        promoted: set[str] = set()
+        if lazy:
+            system = f"{system}\n\n{self._summary_pool()}"
+            promoted = self._mentioned_tools(task)
+
         messages: list[dict] = [
             {"role": "system", "content": system},
             {"role": "user",   "content": task},
         ]
 
-        schemas = self._tool_schemas()
+        # Request kwargs are bound once; per turn only `messages` changes
+        # (plus `tools` while lazy promotion is active, and the final turn's
+        # tool_choice).
+        base: dict[str, Any] = {
+            "model":       self.ORCHESTRATOR_MODEL,
+            "tools":       all_schemas or None,
+            "tool_choice": "auto" if all_schemas else None,
+            "temperature": 0.2,
+            "max_tokens":  2048,
+        }
+        create = self._client.chat.completions.create
 
         for turn in range(max_turns):
-            resp = self._client.chat.completions.create(
-                model=self.ORCHESTRATOR_MODEL,
-                messages=messages,
-                tools=schemas if schemas else None,
-                tool_choice="auto" if schemas else None,
-                temperature=0.2,
-                max_tokens=2048,
-            )
+            # On the last turn the orchestrator must answer, not call more tools.
+            final_turn = turn == max_turns - 1
+            if lazy:
+                schemas = [s for s in all_schemas if s["function"]["name"] in promoted]
+                base["tools"]       = schemas or None
+                base["tool_choice"] = "auto" if schemas else None
+            if final_turn and base["tools"]:
+                base["tool_choice"] = "none"
+            with LLM_GATE.slot():
+                resp = create(messages=messages, **base)
+
+            self._log_cache_usage(resp, turn)
 
             choice = resp.choices[0]
             msg    = choice.message
             # Append the assistant message (may have tool_calls or content)
             messages.append(msg)
 
-            if choice.finish_reason == "tool_calls" and msg.tool_calls:
+            if not final_turn and choice.finish_reason == "tool_calls" and msg.tool_calls:
                 # ── Execute every tool the orchestrator requested ──────────────
-                for tc in msg.tool_calls:
-                    t_name = tc.function.name
-                    t_args = json.loads(tc.function.arguments)
-                    logger.debug(
-                        "[turn %d] orchestrator → tool '%s' args=%s", turn, t_name, t_args
-                    )
-
-                    if t_name not in self._registry:
-                        result = {"error": f"Unknown tool: {t_name}"}
-                    else:
-                        try:
-                            result = self._registry[t_name].func(**t_args)
-                        except Exception as exc:  # noqa: BLE001
-                            logger.exception("Tool '%s' raised an exception.", t_name)
-                            result = {"error": str(exc)}
-
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(result, ensure_ascii=False),
-                    })
+                # Independent calls are all dispatched before any is awaited
+                # (latency ≈ max(t) instead of Σt); results keep request order.
+                calls = msg.tool_calls
+                if len(calls) > 1 and all(self._parallel_safe(tc) for tc in calls):
+                    pending = [(tc, *self._dispatch_tool_call(tc, turn)) for tc in calls]
+                    messages.extend(self._collect_tool_call(*p) for p in pending)
+                else:
+                    for tc in calls:
+                        messages.append(
+                            self._collect_tool_call(tc, *self._dispatch_tool_call(tc, turn))
+                        )
+                self._trim_history(messages)
 
             else:
+                if lazy and not final_turn:
+                    # Phase 2: the orchestrator asked for tools by name — promote
+                    # their full schemas and re-issue the turn without its reply.
+                    wanted = self._mentioned_tools(msg.content or "") - promoted
+                    if wanted:
+                        promoted |= wanted
+                        messages.pop()
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("[turn %d] promoted tool schemas: %s", turn, sorted(wanted))
+                        continue
+
                 # ── Orchestrator has finished — return its response ────────────
                 final = msg.content or ""
                 logger.debug("[turn %d] orchestrator finished.", turn)
                 return final
 
-        # Exhausted max_turns — return whatever the last message said
-        last = messages[-1]
-        if isinstance(last, dict):
-            return last.get("content", "")
-        return getattr(last, "content", "") or ""
+        # Only reachable when max_turns < 1.
+        return ""
+
+    # ── Async, streaming agent loop ────────────────────────────────────────────
+
+    def _aclient(self) -> AsyncGroq:
+        if self._async_client is None:
+            self._async_client = build_async_groq_client()
+        return self._async_client
+
+    @staticmethod
+    def _complete_tool_call(buf: dict) -> ChatCompletionMessageToolCall | None:
+        """
+        Build a tool call from a streamed buffer once its argument JSON is
+        complete; None while fragments are still arriving.
+        """
+        args = buf["arguments"]
+        if not (buf["id"] and buf["name"] and args.rstrip().endswith("}")):
+            return None
+        try:
+            json.loads(args)
+        except json.JSONDecodeError:
+            return None
+        return ChatCompletionMessageToolCall(
+            id=buf["id"], type="function",
+            function=Function(name=buf["name"], arguments=args),
+        )
+
+    @staticmethod
+    async def _acollect_tool_call(tc: Any, future: Future, timeout: float) -> dict:
+        """Async twin of _collect_tool_call()."""
+        t_name = tc.function.name
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Tool '%s' timed out after %.1fs.", t_name, timeout)
+            result = {"error": "tool timeout"}
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Tool '%s' raised an exception.", t_name)
+            result = {"error": str(exc)}
+
+        return {
+            "role": "tool",
+            "tool_call_id": tc.id,
+            "content": _encode_tool_result(result),
+        }
+
+    async def arun(
+        self,
+        task: str,
+        system: str = DEFAULT_RUN_SYSTEM,
+        max_turns: int = 6,
+    ) -> str:
+        """
+        Async, streaming variant of run() with the same parameters and result.
+
+        Each turn is streamed from AsyncGroq.  Tool-call fragments are
+        accumulated as they arrive and a parallel-safe call is started on the
+        tool pool as soon as its argument JSON is complete, so tool execution
+        overlaps the rest of the stream.  All of a turn's results are awaited
+        (in request order) before the next turn is sent.
+        """
+        all_schemas = self._tool_schemas()
+        lazy = len(all_schemas) > self.LAZY_SCHEMA_THRESHOLD
+        promoted: set[str] = set()
+        if lazy:
+            system = f"{system}\n\n{self._summary_pool()}"
+            promoted = self._mentioned_tools(task)
+
+        messages: list[dict] = [
+            {"role": "system", "content": system},
+            {"role": "user",   "content": task},
+        ]
+
+        base: dict[str, Any] = {
+            "model":       self.ORCHESTRATOR_MODEL,
+            "tools":       all_schemas or None,
+            "tool_choice": "auto" if all_schemas else None,
+            "temperature": 0.2,
+            "max_tokens":  2048,
+        }
+        create = self._aclient().chat.completions.create
+
+        for turn in range(max_turns):
+            final_turn = turn == max_turns - 1
+            if lazy:
+                schemas = [s for s in all_schemas if s["function"]["name"] in promoted]
+                base["tools"]       = schemas or None
+                base["tool_choice"] = "auto" if schemas else None
+            if final_turn and base["tools"]:
+                base["tool_choice"] = "none"
+
+            content: list[str] = []
+            buffers: dict[int, dict] = {}
+            started: dict[int, tuple] = {}
+            finish_reason = None
+            last_chunk = None
+            async with LLM_GATE.aslot():
+                async for chunk in await create(messages=messages, stream=True, **base):
+                    last_chunk = chunk
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta  = choice.delta
+                    if delta.content:
+                        content.append(delta.content)
+                    for part in delta.tool_calls or ():
+                        buf = buffers.setdefault(part.index, {"id": "", "name": "", "arguments": ""})
+                        if part.id:
+                            buf["id"] = part.id
+                        if part.function is not None:
+                            buf["name"]      += part.function.name or ""
+                            buf["arguments"] += part.function.arguments or ""
+                        if final_turn or part.index in started:
+                            continue
+                        tc = self._complete_tool_call(buf)
+                        if tc is not None and self._parallel_safe(tc):
+                            started[part.index] = (tc, *self._dispatch_tool_call(tc, turn))
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+
+            self._log_cache_usage(getattr(last_chunk, "x_groq", None), turn)
+            text = "".join(content)
+
+            if not final_turn and finish_reason == "tool_calls" and buffers:
+                calls = [
+                    started[i][0] if i in started else ChatCompletionMessageToolCall(
+                        id=buffers[i]["id"], type="function",
+                        function=Function(name=buffers[i]["name"],
+                                          arguments=buffers[i]["arguments"]),
+                    )
+                    for i in sorted(buffers)
+                ]
+                messages.append({
+                    "role": "assistant",
+                    "content": text or None,
+                    "tool_calls": [tc.model_dump() for tc in calls],
+                })
+                # Calls not started mid-stream run here, one at a time.
+                for i, tc in zip(sorted(buffers), calls):
+                    pending = started.get(i) or (tc, *self._dispatch_tool_call(tc, turn))
+                    messages.append(await self._acollect_tool_call(*pending))
+                self._trim_history(messages)
+                continue
+
+            if lazy and not final_turn:
+                wanted = self._mentioned_tools(text) - promoted
+                if wanted:
+                    promoted |= wanted
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("[turn %d] promoted tool schemas: %s", turn, sorted(wanted))
+                    continue
+
+            logger.debug("[turn %d] orchestrator finished.", turn)
+            return text
+
+        # Only reachable when max_turns < 1.
+        return ""
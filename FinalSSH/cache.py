@@ -0,0 +1,106 @@
+"""
+cache.py
+────────
+Small in-process caching primitives shared by the agent layer and tools.
+
+  TTLCache     — thread-safe LRU mapping whose entries expire after `ttl` seconds.
+  SingleFlight — collapses concurrent calls for the same key into one execution.
+
+Everything here is stdlib-only and safe to use from Flask's worker threads.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+# Sentinel so cached falsy values (None, {}, 0) are still treated as hits.
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry expiry.
+
+    get() returns MISSING on a miss or an expired entry; set() evicts the
+    least-recently-used entry once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return MISSING if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent work: while do(key, fn) is running for a key, other
+    callers with the same key wait for that result instead of running fn too.
+
+    do() returns (result, shared) — `shared` is True for the waiters.  The key
+    is forgotten once the leader finishes, so nothing is cached beyond the
+    in-flight window; an exception raised by fn is re-raised in every caller.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = Future()
+        if not leader:
+            return flight.result(), True
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
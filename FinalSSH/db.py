@@ -8,13 +8,26 @@ Tables
   interaction_logs : raw submission payloads + computed ΔD for audit/ML
 """
 
+import atexit
+import hashlib
 import json
+import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
 import uuid
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+
+from question_cache import question_text
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "study_assistant.db")
 
+logger = logging.getLogger(__name__)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Schema (DDL)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -45,6 +58,22 @@ CREATE TABLE IF NOT EXISTS questions (
 
 CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions(difficulty);
 CREATE INDEX IF NOT EXISTS idx_questions_topic      ON questions(topic);
+CREATE INDEX IF NOT EXISTS idx_questions_topic_diff ON questions(topic, difficulty);
+
+-- ── Question Pool ───────────────────────────────────────────────────────────
+-- Generated questions shared across sessions (see question_cache.py), kept
+-- so the in-memory pool can be re-warmed after a restart.
+-- `payload` is the question dict as JSON; `created_at` is Unix time.
+CREATE TABLE IF NOT EXISTS pooled_questions (
+    level           INTEGER NOT NULL,
+    topic           TEXT    NOT NULL,   -- normalised (see pool_key)
+    difficulty      TEXT    NOT NULL,
+    proficiency     TEXT    NOT NULL,
+    question_text   TEXT    NOT NULL,
+    payload         TEXT    NOT NULL,   -- JSON blob
+    created_at      REAL    NOT NULL,
+    PRIMARY KEY (level, topic, difficulty, proficiency, question_text)
+);
 
 -- ── Interaction Logs ────────────────────────────────────────────────────────
 -- Raw submission payload + computed values, useful for ML/analytics.
@@ -100,20 +129,128 @@ CREATE TABLE IF NOT EXISTS skill_scores (
 # Connection
 # ─────────────────────────────────────────────────────────────────────────────
 
+# Per-connection tuning.  WAL lets readers proceed while a writer commits;
+# synchronous=NORMAL is durable across app crashes in WAL mode; busy_timeout
+# makes a contended writer wait instead of failing with "database is locked".
+_CONN_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",    # 256 MiB
+    "PRAGMA cache_size=-65536",      # 64 MiB
+    "PRAGMA busy_timeout=5000",
+)
+
+# One connection per (thread, DB_PATH), reused across requests instead of
+# opening a new one on every helper call.
+_local = threading.local()
+
+
 def _get_conn() -> sqlite3.Connection:
+    """
+    Return this thread's connection, opening it on first use.
+    Use as `with _get_conn() as conn:` — the block is one transaction.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")   # safe for concurrent reads
-    conn.execute("PRAGMA foreign_keys=ON")
+    for pragma in _CONN_PRAGMAS:
+        conn.execute(pragma)
+    _local.conn, _local.path = conn, DB_PATH
     return conn
 
 
 def init_db() -> None:
     """Create tables if they don't exist. Safe to call on every startup."""
     with _get_conn() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")   # persistent: set once per file
         conn.executescript(SCHEMA)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Write-behind queue
+# ─────────────────────────────────────────────────────────────────────────────
+# Append-only inserts (generated questions, interaction logs) are queued and
+# written by one daemon thread in batched transactions — up to
+# WRITE_BATCH_MAX rows or WRITE_BATCH_WINDOW seconds per commit — instead of
+# one commit per request.  Questions stay readable through get_question()
+# while queued.  flush() blocks until everything queued so far is written.
+
+WRITE_BATCH_MAX    = 100
+WRITE_BATCH_WINDOW = 0.05
+
+_write_queue: queue.Queue = queue.Queue()
+_pending_questions: dict[str, dict] = {}
+_pending_lock  = threading.Lock()
+_writer_lock   = threading.Lock()
+_writer_thread: threading.Thread | None = None
+
+
+def _enqueue_write(sql: str, params: tuple, pending_id: str | None = None) -> None:
+    global _writer_thread
+    if _writer_thread is None:
+        with _writer_lock:
+            if _writer_thread is None:
+                _writer_thread = threading.Thread(
+                    target=_writer_loop, name="db-writer", daemon=True,
+                )
+                _writer_thread.start()
+    _write_queue.put((sql, params, pending_id))
+
+
+def _writer_loop() -> None:
+    while True:
+        batch = [_write_queue.get()]
+        deadline = time.monotonic() + WRITE_BATCH_WINDOW
+        while len(batch) < WRITE_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write_batch(batch)
+
+
+def _write_batch(batch: list[tuple]) -> None:
+    # Runs of the same statement become one executemany(); queue order is
+    # kept so a question row always lands before logs that reference it.
+    try:
+        with _get_conn() as conn:
+            for sql, run in groupby(batch, key=itemgetter(0)):
+                conn.executemany(sql, [params for _, params, _ in run])
+    except sqlite3.Error:
+        # One bad row rolls back the whole batch — retry row by row so only
+        # that row is lost.
+        logger.warning("Batched DB write failed; retrying %d rows singly.", len(batch))
+        conn = _get_conn()
+        for sql, params, _ in batch:
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except sqlite3.Error:
+                logger.exception("Background DB write failed: %s", sql.split("(")[0].strip())
+    finally:
+        with _pending_lock:
+            for _, _, pending_id in batch:
+                if pending_id is not None:
+                    _pending_questions.pop(pending_id, None)
+        for _ in batch:
+            _write_queue.task_done()
+
+
+def flush() -> None:
+    """Block until every write queued so far has been committed."""
+    if _writer_thread is not None:
+        _write_queue.join()
+
+
+atexit.register(flush)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # User helpers
 # ─────────────────────────────────────────────────────────────────────────────
@@ -137,23 +274,48 @@ def get_or_create_user(user_id: str, initial_difficulty: float = 5.0) -> float:
         return initial_difficulty
 
 
+def _upsert_user_difficulty(
+    conn: sqlite3.Connection, user_id: str, new_difficulty: float
+) -> None:
+    conn.execute("""
+        INSERT INTO users (user_id, current_difficulty, questions_answered, updated_at)
+        VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id) DO UPDATE SET
+            current_difficulty  = excluded.current_difficulty,
+            questions_answered  = questions_answered + 1,
+            updated_at          = CURRENT_TIMESTAMP
+    """, (user_id, new_difficulty))
+
+
 def update_user_difficulty(user_id: str, new_difficulty: float) -> None:
     """Upsert the user's difficulty and increment their question counter."""
     with _get_conn() as conn:
-        conn.execute("""
-            INSERT INTO users (user_id, current_difficulty, questions_answered, updated_at)
-            VALUES (?, ?, 1, CURRENT_TIMESTAMP)
-            ON CONFLICT(user_id) DO UPDATE SET
-                current_difficulty  = excluded.current_difficulty,
-                questions_answered  = questions_answered + 1,
-                updated_at          = CURRENT_TIMESTAMP
-        """, (user_id, new_difficulty))
+        _upsert_user_difficulty(conn, user_id, new_difficulty)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Question helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
+_INSERT_QUESTION_SQL = """
+    INSERT OR IGNORE INTO questions
+        (question_id, topic, question_text, options, correct_answer,
+         difficulty, expected_time_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def question_fingerprint(q: dict) -> str:
+    """
+    Content-derived question_id: identical generations (same text, options and
+    answer) map to the same id, so a repeat collapses into the existing row.
+    """
+    payload = "\x1f".join((
+        q["question"], json.dumps(q["options"], separators=(",", ":")), q["correct"],
+    ))
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+
 def save_question(
     question_id: str,
     topic: str,
@@ -164,36 +326,90 @@ def save_question(
     """
     Persist a Groq-generated question.
     Silently ignores duplicate question_ids (INSERT OR IGNORE).
+
+    The insert is queued for the background writer (see Write-behind queue);
+    get_question() sees the question immediately via the pending map.
     """
-    with _get_conn() as conn:
-        conn.execute("""
-            INSERT OR IGNORE INTO questions
-                (question_id, topic, question_text, options, correct_answer,
-                 difficulty, expected_time_ms)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            question_id,
-            topic,
-            q["question"],
-            json.dumps(q["options"]),
-            q["correct"],
-            difficulty,
-            expected_time_ms,
-        ))
+    options_json = json.dumps(q["options"])
+    with _pending_lock:
+        if question_id in _pending_questions:
+            return   # same question already queued
+        _pending_questions[question_id] = {
+            "question_id":      question_id,
+            "topic":            topic,
+            "question_text":    q["question"],
+            "options":          options_json,
+            "correct_answer":   q["correct"],
+            "difficulty":       difficulty,
+            "expected_time_ms": expected_time_ms,
+        }
+    _enqueue_write(_INSERT_QUESTION_SQL, (
+        question_id,
+        topic,
+        q["question"],
+        options_json,
+        q["correct"],
+        difficulty,
+        expected_time_ms,
+    ), pending_id=question_id)
 
 
-def get_question(question_id: str) -> dict | None:
-    """Return a question row as a plain dict, or None if not found."""
+# Stored questions never change (inserts are INSERT OR IGNORE), so decoded
+# rows can be kept in memory indefinitely; only the LRU bound evicts them.
+QUESTION_CACHE_SIZE = 10_000
+
+
+@lru_cache(maxsize=QUESTION_CACHE_SIZE)
+def _load_question(question_id: str) -> dict:
+    """Decoded question row; raises KeyError so misses are never cached."""
     with _get_conn() as conn:
         row = conn.execute(
             "SELECT * FROM questions WHERE question_id = ?",
             (question_id,)
         ).fetchone()
-        if not row:
-            return None
-        d = dict(row)
+    if not row:
+        raise KeyError(question_id)
+    d = dict(row)
+    d["options"] = json.loads(d["options"])
+    return d
+
+
+def get_question(question_id: str) -> dict | None:
+    """Return a question row as a plain dict, or None if not found."""
+    with _pending_lock:
+        pending = _pending_questions.get(question_id)
+    if pending is not None:
+        d = dict(pending)
         d["options"] = json.loads(d["options"])
         return d
+    try:
+        return dict(_load_question(question_id))
+    except KeyError:
+        return None
+
+
+def get_question_texts(question_ids: list[str]) -> list[str]:
+    """
+    Question texts for `question_ids`, in order; unknown ids are skipped.
+    Pending rows are answered from memory, the rest with a single
+    SELECT ... IN (...) instead of one query per id.
+    """
+    texts: dict[str, str] = {}
+    with _pending_lock:
+        for qid in question_ids:
+            pending = _pending_questions.get(qid)
+            if pending is not None:
+                texts[qid] = pending["question_text"]
+    missing = [qid for qid in dict.fromkeys(question_ids) if qid not in texts]
+    if missing:
+        with _get_conn() as conn:
+            rows = conn.execute(
+                "SELECT question_id, question_text FROM questions "
+                f"WHERE question_id IN ({','.join('?' * len(missing))})",
+                missing,
+            ).fetchall()
+        texts.update((row["question_id"], row["question_text"]) for row in rows)
+    return [texts[qid] for qid in question_ids if qid in texts]
 
 
 def get_nearest_question(
@@ -230,6 +446,74 @@ def get_nearest_question(
         return d
 
 
+def get_nearest_question_preferring_topic(
+    target_difficulty: float,
+    exclude_id: str,
+    preferred_topic: str,
+) -> dict | None:
+    """
+    Single-query form of
+        get_nearest_question(d, exclude_id, topic) or get_nearest_question(d, exclude_id)
+    — the closest question in `preferred_topic` if one exists, else the
+    closest question in any topic.
+    """
+    with _get_conn() as conn:
+        row = conn.execute("""
+            SELECT * FROM questions
+            WHERE question_id != ?
+            ORDER BY (topic = ?) DESC, ABS(difficulty - ?) ASC
+            LIMIT 1
+        """, (exclude_id, preferred_topic, target_difficulty)).fetchone()
+
+        if not row:
+            return None
+        d = dict(row)
+        d["options"] = json.loads(d["options"])
+        return d
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Question pool persistence
+# ─────────────────────────────────────────────────────────────────────────────
+# Backing store for question_cache.QuestionPool: pooled questions are written
+# behind like other inserts and read back when a pool key is first used.
+
+_INSERT_POOLED_SQL = """
+    INSERT OR IGNORE INTO pooled_questions
+        (level, topic, difficulty, proficiency, question_text, payload, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def save_pooled_question(key: tuple, q: dict) -> None:
+    """Queue a pooled question under its (level, topic, difficulty, proficiency) key."""
+    _enqueue_write(_INSERT_POOLED_SQL, (
+        *key, question_text(q), json.dumps(q, ensure_ascii=False), time.time(),
+    ))
+
+
+def load_pooled_questions(key: tuple, max_age: float, limit: int) -> list[tuple[float, dict]]:
+    """Newest pooled questions for `key` younger than `max_age` s, as (created_at, q)."""
+    with _get_conn() as conn:
+        rows = conn.execute("""
+            SELECT payload, created_at FROM pooled_questions
+            WHERE level = ? AND topic = ? AND difficulty = ? AND proficiency = ?
+              AND created_at >= ?
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (*key, time.time() - max_age, limit)).fetchall()
+    return [(row["created_at"], json.loads(row["payload"])) for row in rows]
+
+
+def prune_pooled_questions(max_age: float) -> int:
+    """Delete pooled questions older than `max_age` seconds; returns the count."""
+    with _get_conn() as conn:
+        return conn.execute(
+            "DELETE FROM pooled_questions WHERE created_at < ?",
+            (time.time() - max_age,),
+        ).rowcount
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Interaction log
 # ─────────────────────────────────────────────────────────────────────────────
@@ -241,13 +525,49 @@ def log_interaction(
     delta_d: float,
     new_difficulty: float,
 ) -> None:
-    """Append one submission record to interaction_logs."""
+    """Append one submission record to interaction_logs (write-behind)."""
+    _enqueue_write(_INSERT_INTERACTION_SQL, (
+        user_id, question_id, json.dumps(payload), delta_d, new_difficulty,
+    ))
+
+
+_INSERT_INTERACTION_SQL = """
+    INSERT INTO interaction_logs
+        (user_id, question_id, payload, delta_d, new_difficulty)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _insert_interaction(
+    conn: sqlite3.Connection,
+    user_id: str,
+    question_id: str,
+    payload: dict,
+    delta_d: float,
+    new_difficulty: float,
+) -> None:
+    conn.execute(_INSERT_INTERACTION_SQL,
+                 (user_id, question_id, json.dumps(payload), delta_d, new_difficulty))
+
+
+def record_submission(
+    user_id: str,
+    question_id: str,
+    payload: dict,
+    delta_d: float,
+    new_difficulty: float,
+) -> None:
+    """
+    update_user_difficulty + log_interaction in a single transaction:
+    one commit (one WAL sync) per submission, and never one without the other.
+    """
+    with _pending_lock:
+        question_queued = question_id in _pending_questions
+    if question_queued:
+        flush()   # the log row's foreign key needs the question row on disk
     with _get_conn() as conn:
-        conn.execute("""
-            INSERT INTO interaction_logs
-                (user_id, question_id, payload, delta_d, new_difficulty)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, question_id, json.dumps(payload), delta_d, new_difficulty))
+        _upsert_user_difficulty(conn, user_id, new_difficulty)
+        _insert_interaction(conn, user_id, question_id, payload, delta_d, new_difficulty)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
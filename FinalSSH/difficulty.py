@@ -7,8 +7,14 @@ Computes ΔD using the formula:
 
 with edge-case handling for time cap, critical misconceptions, and
 interaction-log guessing penalties.
+
+compute_delta_d scores one submission; compute_delta_d_batch applies the
+same formula column-wise when many rows are rescored at once.
 """
 
+from bisect import bisect_right
+from collections.abc import Iterable, Sequence
+
 # ── Constants ─────────────────────────────────────────────────────────────────
 TIME_CAP_MS = 180_000           # 3-minute AFK cap
 
@@ -20,21 +26,31 @@ CONFIDENCE_SCORE: dict[str, int] = {
 
 DIFFICULTY_BOUNDS = (0.0, 10.0)   # clamp range for D_{n+1}
 
+# Canonical numeric difficulty and expected response time per label.
+LABEL_TO_DIFFICULTY: dict[str, float] = {"easy": 3.0, "medium": 5.0, "hard": 8.0}
+LABEL_TO_EXPECTED_TIME_MS: dict[str, int] = {"easy": 15_000, "medium": 25_000, "hard": 45_000}
+
+# Label thresholds: d < 4.0 → easy, d < 7.0 → medium, else hard.
+_LABEL_BOUNDS = (4.0, 7.0)
+_LABELS = ("easy", "medium", "hard")
+
 
 # ── Core math ─────────────────────────────────────────────────────────────────
-def compute_delta_d(
-    a_score: int,               # 1 = correct, -1 = wrong
+def _delta_d_core(
+    a_score: int,
     time_taken_ms: int,
     expected_time_ms: int,
-    confidence_level: str,      # "LOW" | "MEDIUM" | "HIGH"
-    interaction_log: list[dict],
-    alpha: float = 0.5,
-    beta: float = 0.3,
-    gamma: float = 0.2,
+    c_score: int,               # CONFIDENCE_SCORE value: -1 | 0 | 1
+    option_changes: int,
+    alpha: float,
+    beta: float,
+    gamma: float,
 ) -> float:
     """
-    Returns the raw ΔD value (unbounded).
-    Positive values increase difficulty; negative values decrease it.
+    Purely numeric ΔD kernel (unrounded).  All string/list handling lives in
+    the callers, which keeps this function a straight arithmetic expression
+    over ints and floats — the shape a JIT (e.g. numba.njit) can compile
+    as-is should scoring ever become CPU-bound.
     """
 
     # 1. Accuracy term ─────────────────────────────────────────────────────────
@@ -47,28 +63,90 @@ def compute_delta_d(
     time_term = beta * time_ratio
 
     # 3. Confidence term ───────────────────────────────────────────────────────
-    c_score = CONFIDENCE_SCORE.get(confidence_level.upper(), 0)
-
     # Rule 4: Critical misconception — wrong answer + HIGH confidence
     # Invert & triple the gamma weight so the HIGH-confidence wrong signal
     # actively pulls difficulty DOWN (forces a revisit of foundational content).
-    effective_gamma = gamma
-    if a_score == -1 and confidence_level.upper() == "HIGH":
-        effective_gamma = -3.0 * gamma   # e.g. 0.2 → -0.60
+    # Branchless: critical ∈ {0, 1} maps the multiplier +1 → -3 (0.2 → -0.60).
+    critical = (a_score == -1) * (c_score == 1)
+    gamma_mult = 1 - 4 * critical
 
-    confidence_term = effective_gamma * c_score
+    confidence_term = gamma * gamma_mult * c_score
 
-    # 4. Interaction penalty — repeated option changes indicate guessing ────────
-    # Rule 5: Count CHANGED_OPTION events in the log
-    option_changes = sum(
-        1 for entry in interaction_log
-        if entry.get("action") == "CHANGED_OPTION"
-    )
-    # More than 2 changes → penalise confidence/fluency assessment
+    # 4. Interaction penalty — more than 2 changes → penalise fluency ──────────
     interaction_penalty = -0.10 * max(0, option_changes - 2)
 
-    delta_d = accuracy_term + time_term + confidence_term + interaction_penalty
-    return round(delta_d, 4)
+    return accuracy_term + time_term + confidence_term + interaction_penalty
+
+
+def _compute_delta_d_raw(
+    a_score: int,
+    time_taken_ms: int,
+    expected_time_ms: int,
+    confidence_level: str,
+    interaction_log: list[dict],
+    alpha: float,
+    beta: float,
+    gamma: float,
+) -> float:
+    """Unrounded ΔD: encodes confidence and the interaction log, then scores."""
+    c_score = CONFIDENCE_SCORE.get(confidence_level.upper(), 0)
+
+    # Rule 5: repeated option changes indicate guessing — count CHANGED_OPTION
+    # (comprehension + C-level list.count beats a filtering generator in sum()).
+    option_changes = [entry.get("action") for entry in interaction_log].count("CHANGED_OPTION")
+
+    return _delta_d_core(
+        a_score, time_taken_ms, expected_time_ms, c_score, option_changes,
+        alpha, beta, gamma,
+    )
+
+
+def compute_delta_d(
+    a_score: int,               # 1 = correct, -1 = wrong
+    time_taken_ms: int,
+    expected_time_ms: int,
+    confidence_level: str,      # "LOW" | "MEDIUM" | "HIGH"
+    interaction_log: list[dict],
+    alpha: float = 0.5,
+    beta: float = 0.3,
+    gamma: float = 0.2,
+) -> float:
+    """
+    Returns the raw ΔD value (unbounded).
+    Positive values increase difficulty; negative values decrease it.
+    """
+    return round(_compute_delta_d_raw(
+        a_score, time_taken_ms, expected_time_ms,
+        confidence_level, interaction_log, alpha, beta, gamma,
+    ), 4)
+
+
+def compute_delta_d_batch(
+    a_scores: Sequence[int],            # 1 = correct, -1 = wrong
+    times_taken_ms: Sequence[int],
+    expected_times_ms: Sequence[int],
+    c_scores: Sequence[int],            # pre-mapped via CONFIDENCE_SCORE
+    option_changes: Sequence[int],      # CHANGED_OPTION count per row
+    alpha: float = 0.5,
+    beta: float = 0.3,
+    gamma: float = 0.2,
+) -> list[float]:
+    """
+    Column-wise compute_delta_d for batch rescoring (end-of-quiz recompute,
+    offline evaluation).  Inputs are parallel sequences, one entry per row;
+    confidence and the interaction log are pre-encoded so the per-row work
+    is plain arithmetic with no string or dict handling.
+
+    >>> compute_delta_d_batch([1, -1], [12000, 30000], [25000, 25000], [1, 1], [0, 4])
+    [0.856, -1.36]
+    """
+    return [
+        round(_delta_d_core(a, t, e, c, n, alpha, beta, gamma), 4)
+        for a, t, e, c, n in zip(
+            a_scores, times_taken_ms, expected_times_ms, c_scores, option_changes,
+            strict=True,
+        )
+    ]
 
 
 def compute_next_difficulty(
@@ -91,30 +169,35 @@ def compute_next_difficulty(
     >>> d_new, delta
     (5.856, 0.856)
     """
-    delta = compute_delta_d(
+    # Round once at the end — clamping an already-rounded ΔD double-rounds.
+    delta = _compute_delta_d_raw(
         a_score, time_taken_ms, expected_time_ms,
         confidence_level, interaction_log, alpha, beta, gamma,
     )
     lo, hi = DIFFICULTY_BOUNDS
     d_new = max(lo, min(hi, current_difficulty + delta))
-    return round(d_new, 4), delta
+    return round(d_new, 4), round(delta, 4)
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 def difficulty_to_label(d: float) -> str:
     """Map numeric difficulty [0–10] to a human-readable label."""
-    if d < 4.0:
-        return "easy"
-    if d < 7.0:
-        return "medium"
-    return "hard"
+    # bisect_right so a value equal to a bound falls into the upper label.
+    return _LABELS[bisect_right(_LABEL_BOUNDS, d)]
+
+
+def difficulty_to_labels(ds: Iterable[float]) -> list[str]:
+    """Batch difficulty_to_label, e.g. after compute_delta_d_batch."""
+    return [_LABELS[bisect_right(_LABEL_BOUNDS, d)] for d in ds]
 
 
 def label_to_difficulty(label: str) -> float:
     """Canonical numeric value for each label (used when seeding questions)."""
-    return {"easy": 3.0, "medium": 5.0, "hard": 8.0}.get(label.lower(), 5.0)
+    d = LABEL_TO_DIFFICULTY.get(label)      # labels are normally lower-case already
+    return d if d is not None else LABEL_TO_DIFFICULTY.get(label.lower(), 5.0)
 
 
 def label_to_expected_time(label: str) -> int:
     """Expected response time in ms per difficulty label."""
-    return {"easy": 15_000, "medium": 25_000, "hard": 45_000}.get(label.lower(), 25_000)
+    t = LABEL_TO_EXPECTED_TIME_MS.get(label)
+    return t if t is not None else LABEL_TO_EXPECTED_TIME_MS.get(label.lower(), 25_000)
@@ -969,6 +969,7 @@ export default function App() {
   const [currentDiff, setCurrentDiff] = useState("medium");
   const [recentScores, setRecentScores] = useState([]);
   const [askedQuestions, setAsked] = useState([]);
+  const [sessionId, setSessionId] = useState("");
   const [history, setHistory] = useState([]);
   const startTimeRef = useRef(null);
 
@@ -1010,7 +1011,7 @@ export default function App() {
         method: "POST", headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ topic, proficiency }),
       }).then(r => r.json());
-      setCurrentQ(data.question);
+      setCurrentQ(data.question); setSessionId(data.session_id || "");
       setAsked([data.question.scenario || data.question.question]);
       setScreen("adaptive-quiz");
       startTimeRef.current = Date.now();
@@ -1024,7 +1025,7 @@ export default function App() {
     try {
       const resp = await fetch(`${API}/adaptive/next`, {
         method: "POST", headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ topic, proficiency, current_level: currentLevel, current_difficulty: currentDiff, last_score_pct: lastScorePct, time_taken_ms: timeTaken, recent_score_pcts: newScores, asked_questions: asked }),
+        body: JSON.stringify({ topic, proficiency, current_level: currentLevel, current_difficulty: currentDiff, last_score_pct: lastScorePct, time_taken_ms: timeTaken, recent_score_pcts: newScores, asked_questions: asked, sessionId }),
       });
       const data = await resp.json();
       if (!resp.ok || data.error) throw new Error(data.detail || data.error || `Server error ${resp.status}`);
@@ -1109,7 +1110,7 @@ export default function App() {
 
   function restart() {
     setSessions(loadSessions()); setScreen("start"); setTopic(""); setHistory([]); setFeedback("");
-    setRecentScores([]); setAsked([]); setCurrentQ(null); resetSubState(); setQuizError(null);
+    setRecentScores([]); setAsked([]); setSessionId(""); setCurrentQ(null); resetSubState(); setQuizError(null);
   }
 
   const isMCQ = currentQ?.type === "mcq";
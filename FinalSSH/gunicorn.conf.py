@@ -0,0 +1,30 @@
+"""
+gunicorn.conf.py
+────────────────
+Production server settings:  gunicorn -c gunicorn.conf.py main:app
+
+Every LLM-bound route spends its time waiting on Groq, so each worker runs a
+thread pool (gthread) — many in-flight requests per process, one copy of the
+app's caches and Groq connection pool per worker.  All values can be
+overridden through the environment.
+
+Why threads rather than async views: Flask runs each `async def` view on a
+private event loop inside the same worker thread, so it would not multiplex
+Groq calls across requests.  Threads give the same overlap here; inside one
+request, independent calls already overlap via agent.submit(), and
+QuizAgent.acall()/arun() (AsyncGroq) serve callers that own an event loop.
+"""
+
+import multiprocessing
+import os
+
+bind    = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+
+worker_class = "gthread"
+threads      = int(os.getenv("GUNICORN_THREADS", 32))
+
+# Scenario generation and Whisper uploads can legitimately take a while.
+timeout          = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive        = 5
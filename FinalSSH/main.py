@@ -1,13 +1,16 @@
 """
 main.py  —  Flask API
 ───────────────────────
-Three-agent adaptive quiz backend.
+Adaptive quiz backend built on a single tool-registry agent.
 
-AGENT MAP
-─────────
-  level1_agent  → generate_mcq, generate_feedback          (L1 — Knowledge, MCQ)
-  level2_agent  → generate_why_question, evaluate_why_answer (L2 — Understanding, open text)
-  level3_agent  → generate_scenario, evaluate_scenario       (L3 — Mastery, decision tree)
+TOOL MAP  (all registered on `agent`)
+────────
+  L1 — Knowledge, MCQ           → generate_mcq, generate_mcq_batch, generate_feedback
+  L2 — Understanding, open text → generate_why_question, evaluate_why_answer
+  L3 — Mastery, decision tree   → generate_scenario, evaluate_scenario
+  Interview / analytics         → generate_interview_question[_batch],
+                                  generate_interview_analysis, evaluate_interview_answer,
+                                  generate_improvement_plan
 
 LEVEL 3 DESIGN (new)
 ─────────────────────
@@ -25,8 +28,25 @@ ADAPTIVE ROUTES (unified flow)
 MANUAL ROUTES (still usable)
 ──────────────────────────────
   POST /start  /next  /feedback  /submit   ← L1 MCQ (unchanged)
+  GET  /questions/<id>                     ← re-fetch a stored L1 question
   POST /l2/question  /l2/evaluate          ← L2 open question
   POST /l3/question  /l3/evaluate          ← L3 decision-tree scenario
+  POST /interview/evaluate/batch           ← score many answers concurrently
+
+  /next accepts `asked_question_ids` (ids returned by /start and /next) in
+  place of — or alongside — the full `asked_questions` texts.
+
+LOAD SHEDDING
+─────────────
+  Every Groq call passes throttle.LLM_GATE (concurrency cap + rate limit);
+  when no slot frees up in time the route answers 429 with Retry-After.
+
+STREAMING
+─────────
+  /start, /next, /feedback, /l3/question, /interview/start,
+  /interview/next and /interview/analyze stream as Server-Sent Events when
+  called with ?stream=1 (or Accept: text/event-stream):
+  `token` events while the model writes, then `done` with the usual JSON.
 
 Level progression (rolling last-2 window)
 ──────────────────────────────────────────
@@ -41,75 +61,153 @@ Difficulty thresholds per level (milliseconds)
   L3: easy 5min medium 8min hard 12min  (scenarios take much longer)
 """
 
-import uuid
+import json
+import os
+import queue
 import logging
-from flask import Flask, request, jsonify
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from groq import Groq
 from dotenv import load_dotenv
 
-from agent import QuizAgent
-from tools.mcq_tool              import create_mcq_tool
+from agent import QuizAgent, ToolArgumentError, build_groq_client
+from cache import MISSING, SingleFlight, TTLCache
+from throttle import LLM_GATE, LLMBusyError
+from question_cache import QuestionPool, pool_key, question_text, was_asked
+from payloads import (
+    AdaptiveNextReq, AdaptiveStartReq, InterviewEvalBatchReq, InterviewEvalReq,
+    PayloadError, SubmitReq, parse, proficiency_band,
+)
+from tools import ASKED_PROMPT_LIMIT, recent_unique
+from tools.mcq_tool              import create_mcq_tool, create_mcq_batch_tool
 from tools.feedback_tool         import create_feedback_tool
 from tools.level2_question_tool  import create_level2_question_tool
 from tools.level2_eval_tool      import create_level2_eval_tool
 from tools.level3_question_tool  import create_level3_question_tool
 from tools.level3_eval_tool      import create_level3_eval_tool
 from tools.improvement_tool       import create_improvement_tool
+from tools.interview_tool import (
+    create_interview_question_tool,
+    create_interview_question_batch_tool,
+    create_interview_eval_tool,
+    create_interview_analysis_tool,
+)
 from db import (
-    init_db, get_or_create_user, update_user_difficulty,
-    save_question, get_question, get_nearest_question, log_interaction,
-    save_assessment_session, get_analytics_summary
+    init_db, get_or_create_user, record_submission,
+    save_question, question_fingerprint, get_question, get_question_texts,
+    get_nearest_question_preferring_topic,
+    save_assessment_session, get_analytics_summary,
+    load_pooled_questions, save_pooled_question, prune_pooled_questions,
 )
 from difficulty import (
+    LABEL_TO_DIFFICULTY, LABEL_TO_EXPECTED_TIME_MS,
     compute_next_difficulty, difficulty_to_label,
-    label_to_difficulty, label_to_expected_time,
 )
 
 # ── Bootstrap ─────────────────────────────────────────────────────────────────
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    Cheaper jsonify(): no key sorting, no pretty-printing (even under debug),
+    and UTF-8 passed through instead of \\uXXXX-escaped.  Responses go through
+    one pre-built encoder; json.dumps() with options would construct a new
+    JSONEncoder on every call.
+    """
+    sort_keys    = False
+    compact      = True
+    ensure_ascii = False
+
+    def __init__(self, app: Flask) -> None:
+        super().__init__(app)
+        self.encode = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), default=self.default,
+        ).encode
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self.encode(obj)}\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__)
-CORS(app)
+# Set on this app only; assigning Flask.json_provider_class would change
+# every Flask app in the process.
+app.json = CompactJSONProvider(app)
+# Reject oversized uploads before they are spooled (Groq Whisper caps files at 25 MB).
+app.config["MAX_CONTENT_LENGTH"] = 25 * 1024 * 1024
+# Explicit origins (comma-separated CORS_ORIGINS) instead of "*"; max_age
+# lets browsers cache preflight results instead of repeating OPTIONS.
+CORS(
+    app,
+    origins=os.getenv(
+        "CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173"
+    ).split(","),
+    max_age=86400,
+)
 init_db()
-client = Groq()
+client = build_groq_client()
 
-# ── Build agents ──────────────────────────────────────────────────────────────
-level1_agent = (
-    QuizAgent(client)
-    .register(create_mcq_tool(client))
-    .register(create_feedback_tool(client))
-)
+# Speech-to-text model for /interview/transcribe.  The turbo variant is
+# several times faster than whisper-large-v3 at near-identical English
+# accuracy; set WHISPER_MODEL=whisper-large-v3 to trade speed for accuracy.
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-large-v3-turbo")
 
-level2_agent = (
-    QuizAgent(client)
-    .register(create_level2_question_tool(client))
-    .register(create_level2_eval_tool(client))
-)
 
-level3_agent = (
-    QuizAgent(client)
-    .register(create_level3_question_tool(client))  # → tool name: "generate_scenario"
-    .register(create_level3_eval_tool(client))       # → tool name: "evaluate_scenario"
-)
+@app.errorhandler(PayloadError)
+def _payload_error(e: PayloadError):
+    return jsonify({"error": str(e)}), 422
 
-# ── Interview Agent ───────────────────────────────────────────────────────────
-from tools.interview_tool import (
-    create_interview_question_tool,
-    create_interview_eval_tool,
-    create_interview_analysis_tool,
-)
 
-interview_agent = (
-    QuizAgent(client)
-    .register(create_interview_question_tool(client))
-    .register(create_interview_eval_tool(client))
-    .register(create_interview_analysis_tool(client))
-)
+@app.errorhandler(ToolArgumentError)
+def _tool_argument_error(e: ToolArgumentError):
+    # Request values the tool schema rejects (e.g. an unknown difficulty).
+    return jsonify({"error": str(e)}), 422
+
+
+@app.errorhandler(LLMBusyError)
+def _llm_busy(e: LLMBusyError):
+    # Shed load instead of queueing: the client retries once capacity frees up.
+    return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
 
-improvement_agent = (
-    QuizAgent(client)
-    .register(create_improvement_tool(client))
+
+def _json_body():
+    """
+    Decode the request body straight from its bytes, or None when it is empty
+    or not valid JSON.  Unlike get_json(), nothing is cached on the request
+    and the Content-Type header is not consulted.
+    """
+    try:
+        return json.loads(request.get_data(cache=False))
+    except ValueError:
+        return None
+
+
+# ── Build the agent ───────────────────────────────────────────────────────────
+# One registry for every tool; routes select the capability by tool name.
+agent = QuizAgent(client).register(
+    # L1 — Knowledge (MCQ)
+    create_mcq_tool(client),
+    create_mcq_batch_tool(client),
+    create_feedback_tool(client),
+    # L2 — Understanding (open "why" questions)
+    create_level2_question_tool(client),
+    create_level2_eval_tool(client),
+    # L3 — Mastery (branching decision tree)
+    create_level3_question_tool(client),   # → tool name: "generate_scenario"
+    create_level3_eval_tool(client),        # → tool name: "evaluate_scenario"
+    # AI interview
+    create_interview_question_tool(client),
+    create_interview_question_batch_tool(client),
+    create_interview_eval_tool(client),
+    create_interview_analysis_tool(client),
+    # Analytics
+    create_improvement_tool(client),
 )
 
 # ── Expected response time per level × difficulty (ms) ───────────────────────
@@ -120,6 +218,16 @@ EXPECTED_TIME_MS = {
 }
 
 LEVELS = ["easy", "medium", "hard"]
+LEVEL_IDX = {label: i for i, label in enumerate(LEVELS)}
+
+# Level transitions look at the average of this many most-recent scores.
+ADAPT_WINDOW = 2
+
+# Outcomes (1 = failed) of the most recent L3 generations; once this many of
+# them failed, the L2 fallback is generated speculatively alongside L3.
+L3_HEDGE_WINDOW         = 10
+L3_HEDGE_AFTER_FAILURES = 3
+_L3_RECENT_FAILURES: deque[int] = deque(maxlen=L3_HEDGE_WINDOW)
 
 
 # ── Adaptive helpers ───────────────────────────────────────────────────────────
@@ -127,43 +235,67 @@ LEVELS = ["easy", "medium", "hard"]
 def _adapt_difficulty(level: int, current_diff: str,
                       is_good: bool, time_ms: int) -> str:
     """Difficutly up (correct + fast), down (poor/slow), or stay."""
-    idx      = LEVELS.index(current_diff)
     expected = EXPECTED_TIME_MS[level].get(current_diff, 25_000)
-    if not is_good:
-        idx = max(idx - 1, 0)
-    elif time_ms <= expected:
-        idx = min(idx + 1, 2)
-    return LEVELS[idx]
+    # +1 when good and in time, 0 when good but slow, -1 when poor; one clamp.
+    step = (time_ms <= expected) if is_good else -1
+    return LEVELS[max(0, min(2, LEVEL_IDX.get(current_diff, 1) + step))]
 
 
 def _adapt_level(current_level: int, recent_score_pcts: list[float]) -> int:
-    """Auto-transition L1↔L2↔L3 based on rolling 2-question score window."""
-    if not recent_score_pcts:
+    """Auto-transition L1↔L2↔L3 based on a rolling ADAPT_WINDOW-question score window."""
+    # A transition needs a full window.
+    if len(recent_score_pcts) < ADAPT_WINDOW:
         return current_level
-    window = recent_score_pcts[-2:]
-    avg    = sum(window) / len(window)
+    avg = sum(recent_score_pcts[-ADAPT_WINDOW:]) / ADAPT_WINDOW
 
     if current_level == 1 and avg >= 80:
-        logging.info("Level UP: L1 → L2 (avg %.0f%%)", avg)
         return 2
     if current_level == 2:
         if avg >= 75:
-            logging.info("Level UP: L2 → L3 (avg %.0f%%)", avg)
             return 3
         if avg < 35:
-            logging.info("Level DOWN: L2 → L1 (avg %.0f%%)", avg)
             return 1
     if current_level == 3 and avg < 35:
-        logging.info("Level DOWN: L3 → L2 (avg %.0f%%)", avg)
         return 2
     return current_level
 
 
+# Questions generated for one session are reused by others asking for the
+# same (level, topic, difficulty, proficiency) — see question_cache.py.
+# The pool is persisted in SQLite, so it survives restarts and is shared
+# across gunicorn workers.
+question_pool = QuestionPool(loader=load_pooled_questions, saver=save_pooled_question)
+prune_pooled_questions(question_pool.ttl)
+# One in-flight generation per pool key; concurrent misses share its result.
+_generation_flights = SingleFlight()
+
+
 def _generate_for_level(level: int, topic: str, difficulty: str,
                         proficiency: str, asked: list[str]) -> dict:
-    """Dispatch to correct agent and attach type/level/difficulty metadata."""
+    """Serve a pooled question when one is available, else generate it."""
+    key = pool_key(level, topic, difficulty, proficiency)
+    q = question_pool.take(key, asked)
+    if q is not None:
+        return q
+
+    def generate() -> dict:
+        fresh = _generate_fresh(level, topic, difficulty, proficiency, asked)
+        if not fresh.get("_fallback"):
+            question_pool.put(key, fresh)
+        return fresh
+
+    q, shared = _generation_flights.do(key, generate)
+    # A follower's session may already have seen the leader's question.
+    if shared and was_asked(question_text(q), asked):
+        return generate()
+    return dict(q) if shared else q
+
+
+def _generate_fresh(level: int, topic: str, difficulty: str,
+                    proficiency: str, asked: list[str]) -> dict:
+    """Dispatch to the level's generator tool and attach type/level/difficulty metadata."""
     if level == 1:
-        q = level1_agent.call(
+        q = agent.call(
             "generate_mcq",
             topic=topic, difficulty=difficulty,
             proficiency=proficiency, asked_questions=asked,
@@ -171,7 +303,7 @@ def _generate_for_level(level: int, topic: str, difficulty: str,
         return {**q, "type": "mcq", "level": 1, "difficulty": difficulty}
 
     if level == 2:
-        q = level2_agent.call(
+        q = agent.call(
             "generate_why_question",
             topic=topic, difficulty=difficulty,
             proficiency=proficiency, asked_questions=asked,
@@ -179,8 +311,14 @@ def _generate_for_level(level: int, topic: str, difficulty: str,
         return {**q, "type": "open", "level": 2, "difficulty": difficulty}
 
     # ── Level 3: Branching Decision Tree ──────────────────────────────────────
+    # When L3 generation has been failing lately, hedge: start the L2 fallback
+    # alongside it so a failure costs max(L2, L3) instead of L2 + L3.
+    l2_kwargs = dict(topic=topic, difficulty=difficulty,
+                     proficiency=proficiency, asked_questions=asked)
+    hedge = (agent.submit("generate_why_question", **l2_kwargs)
+             if sum(_L3_RECENT_FAILURES) >= L3_HEDGE_AFTER_FAILURES else None)
     try:
-        q = level3_agent.call(
+        q = agent.call(
             "generate_scenario",
             topic=topic, difficulty=difficulty,
             proficiency=proficiency, asked_questions=asked,
@@ -188,24 +326,213 @@ def _generate_for_level(level: int, topic: str, difficulty: str,
         # Sanity-check the returned structure
         if not q.get("scenario") or not q.get("decision_points"):
             raise ValueError("Scenario response is missing required fields.")
+        _L3_RECENT_FAILURES.append(0)
+        if hedge is not None:
+            hedge.cancel()
         return {**q, "type": "scenario", "level": 3, "difficulty": difficulty}
+    except (LLMBusyError, ToolArgumentError):
+        # Capacity or bad input, not a bad scenario: don't count it against
+        # L3 or fall back.
+        if hedge is not None:
+            hedge.cancel()
+        raise
     except Exception as e:
-        logging.error("L3 scenario generation failed (%s). Falling back to L2.", e)
+        _L3_RECENT_FAILURES.append(1)
+        logger.error("L3 scenario generation failed (%s). Falling back to L2.", e)
         # Graceful fallback: give an L2 open question instead
-        q = level2_agent.call(
-            "generate_why_question",
-            topic=topic, difficulty=difficulty,
-            proficiency=proficiency, asked_questions=asked,
-        )
+        if hedge is not None:
+            q = hedge.result()
+        else:
+            q = agent.call("generate_why_question", **l2_kwargs)
         return {**q, "type": "open", "level": 2, "difficulty": difficulty,
                 "_fallback": True}
 
 
+# ── Next-question prefetch ─────────────────────────────────────────────────────
+# While the user works on a question, the most likely next one (answered well
+# and in time) is generated in the background.  /adaptive/next serves it when
+# its prediction matched; otherwise the future is dropped and it generates
+# on demand.  Unclaimed prefetches expire after PREFETCH_TTL seconds.
+PREFETCH_MAX = 256
+PREFETCH_TTL = 600.0
+_prefetched  = TTLCache(maxsize=PREFETCH_MAX, ttl=PREFETCH_TTL)
+# Own pool: prefetch jobs may themselves submit work to the agents' tool pool.
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+# L1 pools are refilled with one batched LLM call of this many MCQs.
+PREFETCH_MCQ_BATCH = 5
+
+
+def _prefetch_question(level: int, topic: str, difficulty: str,
+                       proficiency: str, asked: list[str]) -> dict:
+    """Prefetch job: top up an empty L1 pool in one batched call, then serve."""
+    key = pool_key(level, topic, difficulty, proficiency)
+    if level == 1 and not question_pool.available(key, asked):
+        try:
+            batch = agent.call(
+                "generate_mcq_batch",
+                topic=topic, difficulty=difficulty, proficiency=proficiency,
+                asked_questions=asked, n=PREFETCH_MCQ_BATCH,
+            )
+            for q in batch:
+                question_pool.put(
+                    key, {**q, "type": "mcq", "level": 1, "difficulty": difficulty},
+                    served=False,
+                )
+        except Exception as e:
+            logger.warning("Batched MCQ prefetch failed (%s).", e)
+    return _generate_for_level(level, topic, difficulty, proficiency, asked)
+
+
+def _prefetch_key(session_id: str, topic: str, proficiency: str,
+                  level: int, difficulty: str) -> tuple:
+    return (session_id, topic.strip().lower(), proficiency, level, difficulty)
+
+
+def _schedule_prefetch(session_id: str, topic: str, proficiency: str,
+                       level: int, difficulty: str, recent_scores: list[float],
+                       asked: list[str], current_q: dict) -> None:
+    """
+    Start generating the question /adaptive/next will most likely need.
+    Prefetches belong to one quiz session (the sessionId /adaptive/start
+    issued); a request without one gets no prefetch.
+    """
+    if not session_id:
+        return
+    next_level = _adapt_level(level, [*recent_scores, 100.0])
+    next_diff  = ("medium" if next_level != level
+                  else _adapt_difficulty(level, difficulty, True, 0))
+    key = _prefetch_key(session_id, topic, proficiency, next_level, next_diff)
+    if _prefetched.get(key) is not MISSING:
+        return
+    current_text = current_q.get("scenario") or current_q.get("question")
+    next_asked   = [*asked, current_text] if current_text else list(asked)
+    _prefetched.set(key, _prefetch_pool.submit(
+        _prefetch_question, next_level, topic, next_diff, proficiency, next_asked,
+    ))
+
+
+def _claim_prefetch(session_id: str, topic: str, proficiency: str,
+                    level: int, difficulty: str, asked: list[str]) -> dict | None:
+    """Return the prefetched question for this key, or None on a miss."""
+    if not session_id:
+        return None
+    pending: Future | object = _prefetched.pop(
+        _prefetch_key(session_id, topic, proficiency, level, difficulty)
+    )
+    if pending is MISSING:
+        return None
+    try:
+        q = pending.result()
+    except Exception as e:
+        logger.warning("Prefetched question failed (%s); generating on demand.", e)
+        return None
+    if was_asked(question_text(q), asked):
+        return None
+    return q
+
+
+# ── Interview question batches ─────────────────────────────────────────────────
+# /interview/start serves question 1 right away and generates the rest of the
+# session in one batched call in the background; /interview/next serves from
+# that batch instead of making one LLM round-trip per question.  A batch is
+# keyed by the session's first question, which the client always sends back
+# as asked_questions[0]; a missing, failed or used-up batch falls back to
+# on-demand generation.
+INTERVIEW_BATCH_SESSIONS = 1024
+INTERVIEW_BATCH_TTL      = 3600.0
+_interview_batches = TTLCache(maxsize=INTERVIEW_BATCH_SESSIONS, ttl=INTERVIEW_BATCH_TTL)
+
+
+def _interview_batch_key(topic: str, proficiency: str, first_question: str) -> tuple:
+    return (topic.strip().lower(), proficiency, first_question)
+
+
+def _schedule_interview_batch(topic: str, proficiency: str, total: int, first_q: dict) -> None:
+    """Start generating questions 2..total of the session opened by `first_q`."""
+    first = question_text(first_q)
+    if total < 2 or not first:
+        return
+    _interview_batches.set(
+        _interview_batch_key(topic, proficiency, first),
+        _prefetch_pool.submit(
+            agent.call, "generate_interview_question_batch",
+            topic=topic, proficiency=proficiency, n=total - 1, asked_questions=[first],
+        ),
+    )
+
+
+def _claim_interview_question(topic: str, proficiency: str, asked: list[str]) -> dict | None:
+    """The session's next batched question not yet asked, or None."""
+    if not asked:
+        return None
+    key = _interview_batch_key(topic, proficiency, asked[0])
+    pending: Future | object = _interview_batches.get(key)
+    if pending is MISSING:
+        return None
+    try:
+        batch = pending.result()
+    except Exception as e:
+        logger.warning("Interview question batch failed (%s); generating on demand.", e)
+        _interview_batches.pop(key)
+        return None
+    seen = set(asked)
+    return next((q for q in batch if question_text(q) not in seen), None)
+
+
+# ── Server-Sent Events ─────────────────────────────────────────────────────────
+# Long generations can be streamed: a client that sends ?stream=1 or
+# `Accept: text/event-stream` receives `token` events as the model writes,
+# then one `done` event carrying the same JSON the plain route returns
+# (or an `error` event).
+
+def _wants_stream() -> bool:
+    return (request.args.get("stream") == "1"
+            or "text/event-stream" in request.headers.get("Accept", ""))
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {app.json.encode(payload)}\n\n"
+
+
+def _sse_done(payload) -> Response:
+    """SSE response for a result that is already available: one `done` event."""
+    return Response(_sse_event("done", payload), mimetype="text/event-stream",
+                    headers=_SSE_HEADERS)
+
+
+def _sse_tool_response(tool_name: str,
+                       shape=lambda result: result, **kwargs) -> Response:
+    """Run a streaming-capable tool and relay its tokens as SSE."""
+    # Reject bad arguments with a 422 before the 200 stream has started.
+    agent.check_args(tool_name, kwargs)
+    tokens: queue.Queue = queue.Queue()
+    pending = agent.submit(tool_name, on_token=tokens.put, **kwargs)
+    pending.add_done_callback(lambda _: tokens.put(None))
+
+    def events():
+        while (token := tokens.get()) is not None:
+            yield _sse_event("token", token)
+        try:
+            yield _sse_event("done", shape(pending.result()))
+        except Exception as e:
+            logger.exception("%s stream failed: %s", tool_name, e)
+            yield _sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers=_SSE_HEADERS)
+
+
 def _persist_and_return(topic: str, difficulty_label: str, q: dict, asked: list) -> dict:
-    qid = str(uuid.uuid4())
-    save_question(qid, topic, q, label_to_difficulty(difficulty_label), label_to_expected_time(difficulty_label))
+    # Labels here always come from LEVELS, so the tables are indexed directly.
+    qid       = question_fingerprint(q)
+    d_numeric = LABEL_TO_DIFFICULTY[difficulty_label]
+    save_question(qid, topic, q, d_numeric, LABEL_TO_EXPECTED_TIME_MS[difficulty_label])
     return {"question_id": qid, "question": q, "difficulty": difficulty_label,
-            "difficulty_numeric": label_to_difficulty(difficulty_label)}
+            "difficulty_numeric": d_numeric}
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -217,14 +544,18 @@ def adaptive_start():
     """
     Start an adaptive quiz. Always begins at L1 / medium.
     Payload: { topic, proficiency?, userId? }
-    Returns: { question: {type, level, difficulty, ...} }
+    Returns: { question: {type, level, difficulty, ...}, session_id }
+    The client echoes session_id as sessionId to /adaptive/next.
     """
-    data        = request.get_json()
-    topic       = data.get("topic", "General Knowledge")
-    proficiency = data.get("proficiency", "intermediate")
-    get_or_create_user(data.get("userId", "anonymous"))
+    req         = parse(AdaptiveStartReq, _json_body())
+    topic       = req.topic
+    proficiency = req.proficiency
+    user_id     = req.user_id
+    session_id  = uuid.uuid4().hex
+    get_or_create_user(user_id)
     q = _generate_for_level(1, topic, "medium", proficiency, [])
-    return jsonify({"question": q})
+    _schedule_prefetch(session_id, topic, proficiency, 1, "medium", [], [], q)
+    return jsonify({"question": q, "session_id": session_id})
 
 
 @app.route("/adaptive/next", methods=["POST"])
@@ -241,34 +572,46 @@ def adaptive_next():
       "last_score_pct":   float, 0-100 (MCQ: 100=correct, open/scenario: score%)
       "time_taken_ms":    int,
       "recent_score_pcts": [float],
-      "asked_questions":  [str]
+      "asked_questions":  [str],
+      "sessionId":        str    from /adaptive/start (enables prefetch)
     }
-    Returns: { question, new_level, new_difficulty, recent_scores }
+    Returns: { question, new_level, new_difficulty, recent_scores (last ADAPT_WINDOW) }
     """
-    data          = request.get_json()
-    topic         = data.get("topic", "General Knowledge")
-    proficiency   = data.get("proficiency", "intermediate")
-    cur_level     = int(data.get("current_level", 1))
-    cur_diff      = data.get("current_difficulty", "medium")
-    last_score    = float(data.get("last_score_pct", 50))
-    time_ms       = int(data.get("time_taken_ms", 0))
-    recent_scores = list(data.get("recent_score_pcts", []))
-    asked         = data.get("asked_questions", [])
+    req           = parse(AdaptiveNextReq, _json_body())
+    topic         = req.topic
+    proficiency   = req.proficiency
+    cur_level     = req.current_level
+    cur_diff      = req.current_difficulty
+    last_score    = req.last_score_pct
+    time_ms       = req.time_taken_ms
+    # Only the last ADAPT_WINDOW scores (history tail + this one) matter.
+    recent_scores = [*req.recent_score_pcts[-(ADAPT_WINDOW - 1):], last_score]
+    asked         = req.asked_questions
+    session_id    = req.session_id
 
     try:
-        recent_scores.append(last_score)
         new_level = _adapt_level(cur_level, recent_scores)
 
         if new_level != cur_level:
             new_diff = "medium"   # reset on level transition
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Level %s: L%d → L%d (recent %s)",
+                            "UP" if new_level > cur_level else "DOWN",
+                            cur_level, new_level, recent_scores)
         else:
             new_diff = _adapt_difficulty(cur_level, cur_diff, last_score >= 60, time_ms)
 
-        q = _generate_for_level(new_level, topic, new_diff, proficiency, asked)
+        q = _claim_prefetch(session_id, topic, proficiency, new_level, new_diff, asked)
+        if q is None:
+            q = _generate_for_level(new_level, topic, new_diff, proficiency, asked)
+        _schedule_prefetch(session_id, topic, proficiency, new_level, new_diff,
+                           recent_scores, asked, q)
         return jsonify({"question": q, "new_level": new_level,
                         "new_difficulty": new_diff, "recent_scores": recent_scores})
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
-        logging.exception("adaptive_next failed: %s", e)
+        logger.exception("adaptive_next failed: %s", e)
         return jsonify({"error": str(e), "detail": "Failed to generate next question"}), 500
 
 
@@ -278,49 +621,97 @@ def adaptive_next():
 
 @app.route("/start", methods=["POST"])
 def start_quiz():
-    data        = request.get_json()
+    data        = _json_body() or {}
     topic       = data.get("topic", "General Knowledge")
-    proficiency = data.get("proficiency", "intermediate")
+    proficiency = proficiency_band(data.get("proficiency"))
+    kwargs = dict(topic=topic, difficulty="medium",
+                  proficiency=proficiency, asked_questions=[])
+    # The user lookup runs while the question is being generated.
+    if _wants_stream():
+        resp = _sse_tool_response(
+            "generate_mcq",
+            shape=lambda q: _persist_and_return(topic, "medium", q, []), **kwargs,
+        )
+        get_or_create_user(data.get("userId", "anonymous"))
+        return resp
+    pending = agent.submit("generate_mcq", **kwargs)
     get_or_create_user(data.get("userId", "anonymous"))
-    q = level1_agent.call("generate_mcq", topic=topic, difficulty="medium",
-                          proficiency=proficiency, asked_questions=[])
+    q = pending.result()
     return jsonify(_persist_and_return(topic, "medium", q, []))
 
 
 @app.route("/next", methods=["POST"])
 def next_question():
-    data         = request.get_json()
+    data         = _json_body() or {}
     topic        = data.get("topic", "General Knowledge")
     time_ms      = data.get("time_taken_ms", 0)
     is_correct   = data.get("is_correct", False)
     cur_diff     = data.get("current_difficulty", "medium")
     asked        = data.get("asked_questions", [])
-    proficiency  = data.get("proficiency", "intermediate")
+    proficiency  = proficiency_band(data.get("proficiency"))
+    # Clients may send the question_ids they were served instead of full
+    # texts; only the most recent ones reach the prompt, so only those are read.
+    asked_ids    = data.get("asked_question_ids")
+    if asked_ids:
+        asked = [*asked, *get_question_texts(recent_unique(asked_ids, ASKED_PROMPT_LIMIT))]
     new_diff     = _adapt_difficulty(1, cur_diff, is_correct, time_ms)
-    q = level1_agent.call("generate_mcq", topic=topic, difficulty=new_diff,
-                          proficiency=proficiency, asked_questions=asked)
+    kwargs = dict(topic=topic, difficulty=new_diff,
+                  proficiency=proficiency, asked_questions=asked)
+    if _wants_stream():
+        return _sse_tool_response(
+            "generate_mcq",
+            shape=lambda q: _persist_and_return(topic, new_diff, q, asked), **kwargs,
+        )
+    q = agent.call("generate_mcq", **kwargs)
     return jsonify(_persist_and_return(topic, new_diff, q, asked))
 
 
 @app.route("/feedback", methods=["POST"])
 def feedback():
-    data    = request.get_json(force=True)
+    data    = _json_body() or {}
     topic   = data.get("topic", "General Knowledge")
     history = data.get("history", [])
     if not history:
         return jsonify({"feedback": "No quiz data to analyse."})
-    return jsonify(level1_agent.call("generate_feedback", topic=topic, history=history))
+    if _wants_stream():
+        return _sse_tool_response("generate_feedback", topic=topic, history=history)
+    return jsonify(agent.call("generate_feedback", topic=topic, history=history))
+
+
+@app.route("/questions/<question_id>", methods=["GET"])
+def fetch_question(question_id: str):
+    """
+    Re-fetch a stored L1 question.  Questions never change once saved, so the
+    id doubles as the ETag and browsers may reuse the response for a minute.
+    """
+    q_row = get_question(question_id)
+    if not q_row:
+        return jsonify({"error": f"Question '{question_id}' not found"}), 404
+    resp = jsonify({"question_id": question_id,
+                    "question": {"question": q_row["question_text"], "options": q_row["options"],
+                                 "correct": q_row["correct_answer"], "explanation": ""},
+                    "difficulty": difficulty_to_label(q_row["difficulty"]),
+                    "difficulty_numeric": q_row["difficulty"]})
+    resp.set_etag(question_id)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 60
+    return resp.make_conditional(request)
+
+
+# Reads overlapped with a request's own writes (see /submit).
+_db_read_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="db-read")
 
 
 @app.route("/submit", methods=["POST"])
 def submit_answer():
-    payload         = request.get_json(force=True)
-    user_id         = payload.get("userId", "anonymous")
-    question_id     = payload.get("questionId")
-    time_taken_ms   = int(payload.get("timeTakenMs", 0))
-    final_answer    = payload.get("finalAnswer", "")
-    confidence      = payload.get("confidenceLevel", "MEDIUM")
-    interaction_log = payload.get("interactionLog", [])
+    payload         = _json_body()
+    req             = parse(SubmitReq, payload)
+    user_id         = req.user_id
+    question_id     = req.question_id
+    time_taken_ms   = req.time_taken_ms
+    final_answer    = req.final_answer
+    confidence      = req.confidence_level
+    interaction_log = req.interaction_log
     q_row = get_question(question_id)
     if not q_row:
         return jsonify({"error": f"Question '{question_id}' not found"}), 404
@@ -333,10 +724,13 @@ def submit_answer():
         time_taken_ms=time_taken_ms, expected_time_ms=q_row["expected_time_ms"],
         confidence_level=confidence, interaction_log=interaction_log,
         alpha=0.5, beta=0.3, gamma=0.2)
-    update_user_difficulty(user_id, d_next)
-    log_interaction(user_id, question_id, payload, delta_d, d_next)
-    next_q_row = get_nearest_question(d_next, exclude_id=question_id, topic=q_row["topic"]) or \
-                 get_nearest_question(d_next, exclude_id=question_id)
+    # The next-question read touches only `questions`; run it alongside the
+    # user/log write (WAL lets the reader proceed while the writer commits).
+    pending_next = _db_read_pool.submit(
+        get_nearest_question_preferring_topic,
+        d_next, exclude_id=question_id, preferred_topic=q_row["topic"])
+    record_submission(user_id, question_id, payload, delta_d, d_next)
+    next_q_row = pending_next.result()
     next_payload = None
     if next_q_row:
         next_payload = {"question_id": next_q_row["question_id"],
@@ -359,23 +753,23 @@ def submit_answer():
 
 @app.route("/l2/question", methods=["POST"])
 def l2_question():
-    data = request.get_json()
-    q = level2_agent.call("generate_why_question",
-                          topic=data.get("topic", "General Knowledge"),
-                          difficulty=data.get("difficulty", "medium"),
-                          proficiency=data.get("proficiency", "intermediate"),
-                          asked_questions=data.get("asked_questions", []))
+    data = _json_body() or {}
+    q = agent.call("generate_why_question",
+                   topic=data.get("topic", "General Knowledge"),
+                   difficulty=data.get("difficulty", "medium"),
+                   proficiency=proficiency_band(data.get("proficiency")),
+                   asked_questions=data.get("asked_questions", []))
     return jsonify(q)
 
 
 @app.route("/l2/evaluate", methods=["POST"])
 def l2_evaluate():
-    data = request.get_json(force=True)
-    result = level2_agent.call("evaluate_why_answer",
-                               question=data.get("question", ""),
-                               user_answer=data.get("user_answer", ""),
-                               sample_answer=data.get("sample_answer", ""),
-                               proficiency=data.get("proficiency", "intermediate"))
+    data = _json_body() or {}
+    result = agent.call("evaluate_why_answer",
+                        question=data.get("question", ""),
+                        user_answer=data.get("user_answer", ""),
+                        sample_answer=data.get("sample_answer", ""),
+                        proficiency=proficiency_band(data.get("proficiency")))
     return jsonify(result)
 
 
@@ -385,13 +779,15 @@ def l2_evaluate():
 
 @app.route("/l3/question", methods=["POST"])
 def l3_question():
-    """Generate a branching decision-tree scenario."""
-    data = request.get_json()
-    q = level3_agent.call("generate_scenario",
-                          topic=data.get("topic", "General Knowledge"),
-                          difficulty=data.get("difficulty", "medium"),
-                          proficiency=data.get("proficiency", "intermediate"),
-                          asked_questions=data.get("asked_questions", []))
+    """Generate a branching decision-tree scenario (SSE with ?stream=1)."""
+    data = _json_body() or {}
+    kwargs = dict(topic=data.get("topic", "General Knowledge"),
+                  difficulty=data.get("difficulty", "medium"),
+                  proficiency=proficiency_band(data.get("proficiency")),
+                  asked_questions=data.get("asked_questions", []))
+    if _wants_stream():
+        return _sse_tool_response("generate_scenario", **kwargs)
+    q = agent.call("generate_scenario", **kwargs)
     return jsonify(q)
 
 
@@ -401,14 +797,14 @@ def l3_evaluate():
     Evaluate all decisions in a scenario for quality AND consistency.
     Payload: { scenario, decision_points[], user_answers{}, sample_answers{}, proficiency? }
     """
-    data = request.get_json(force=True)
-    result = level3_agent.call(
+    data = _json_body() or {}
+    result = agent.call(
         "evaluate_scenario",
         scenario        = data.get("scenario", ""),
         decision_points = data.get("decision_points", []),
         user_answers    = data.get("user_answers", {}),
         sample_answers  = data.get("sample_answers", {}),
-        proficiency     = data.get("proficiency", "intermediate"),
+        proficiency     = proficiency_band(data.get("proficiency")),
     )
     return jsonify(result)
 
@@ -423,19 +819,25 @@ def interview_start():
     Begin an AI interview session. Returns the first question.
     Payload: { topic, proficiency?, total_questions? }
     """
-    data        = request.get_json()
+    data        = _json_body() or {}
     topic       = data.get("topic", "General Knowledge")
-    proficiency = data.get("proficiency", "intermediate")
+    proficiency = proficiency_band(data.get("proficiency"))
     total       = int(data.get("total_questions", 5))
+    kwargs = dict(topic=topic, proficiency=proficiency,
+                  question_num=1, total=total, asked_questions=[])
+
+    def started(q: dict) -> dict:
+        _schedule_interview_batch(topic, proficiency, total, q)
+        return {"question": q, "question_num": 1}
+
+    if _wants_stream():
+        return _sse_tool_response("generate_interview_question", shape=started, **kwargs)
     try:
-        q = interview_agent.call(
-            "generate_interview_question",
-            topic=topic, proficiency=proficiency,
-            question_num=1, total=total, asked_questions=[],
-        )
-        return jsonify({"question": q, "question_num": 1})
+        return jsonify(started(agent.call("generate_interview_question", **kwargs)))
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
-        logging.exception("interview_start failed: %s", e)
+        logger.exception("interview_start failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -449,21 +851,31 @@ def interview_transcribe():
     if "audio" not in request.files:
         return jsonify({"error": "No audio file in request"}), 400
     audio_file = request.files["audio"]
-    audio_bytes = audio_file.read()
-    if not audio_bytes:
+    # Hand the spooled upload to the SDK as a file object instead of copying
+    # the whole recording into a bytes object first.
+    audio_stream = audio_file.stream
+    audio_stream.seek(0, 2)
+    if not audio_stream.tell():
         return jsonify({"error": "Empty audio file"}), 400
+    audio_stream.seek(0)
     try:
-        transcription = client.audio.transcriptions.create(
-            file=(audio_file.filename or "recording.webm", audio_bytes, "audio/webm"),
-            model="whisper-large-v3",
-            response_format="text",
-            language="en",
-            temperature=0.0,
-        )
+        with LLM_GATE.slot():
+            # The raw response exposes Groq's rate-limit headers to the gate.
+            raw = client.audio.transcriptions.with_raw_response.create(
+                file=(audio_file.filename or "recording.webm", audio_stream, "audio/webm"),
+                model=WHISPER_MODEL,
+                response_format="text",
+                language="en",
+                temperature=0.0,
+            )
+            LLM_GATE.observe(raw.headers)
+        transcription = raw.parse()
         # Groq returns the transcript string directly for response_format="text"
         return jsonify({"transcript": transcription if isinstance(transcription, str) else transcription.text})
+    except LLMBusyError:
+        raise
     except Exception as e:
-        logging.exception("Whisper transcription failed: %s", e)
+        logger.exception("Whisper transcription failed: %s", e)
         return jsonify({"error": f"Transcription failed: {str(e)}"}), 500
 
 
@@ -473,60 +885,118 @@ def interview_evaluate():
     Semantically evaluate a candidate's spoken/typed answer.
     Payload: { question, user_answer, expected_concepts[], proficiency? }
     """
-    data = request.get_json(force=True)
+    req = parse(InterviewEvalReq, _json_body())
     try:
-        result = interview_agent.call(
+        result = agent.call(
             "evaluate_interview_answer",
-            question=data.get("question", ""),
-            user_answer=data.get("user_answer", ""),
-            expected_concepts=data.get("expected_concepts", []),
-            proficiency=data.get("proficiency", "intermediate"),
+            question=req.question,
+            user_answer=req.user_answer,
+            expected_concepts=req.expected_concepts,
+            proficiency=req.proficiency,
         )
         return jsonify(result)
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
-        logging.exception("interview_evaluate failed: %s", e)
+        logger.exception("interview_evaluate failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
+# Upper bound on answers per /interview/evaluate/batch request.
+INTERVIEW_BATCH_MAX = 20
+
+
+@app.route("/interview/evaluate/batch", methods=["POST"])
+def interview_evaluate_batch():
+    """
+    Evaluate several interview answers at once.  The evaluations run
+    concurrently on the agent's tool pool (each still passes LLM_GATE), so a
+    batch costs roughly one Groq round-trip instead of one per answer.
+    Payload: { answers: [{ question, user_answer, expected_concepts[], proficiency? }] }
+    Returns: { results: [...] } in payload order; a failed item is { error }.
+    """
+    batch = parse(InterviewEvalBatchReq, _json_body())
+    if len(batch.answers) > INTERVIEW_BATCH_MAX:
+        raise PayloadError(f"At most {INTERVIEW_BATCH_MAX} answers per batch.")
+    reqs    = [parse(InterviewEvalReq, item) for item in batch.answers]
+    pending = [
+        agent.submit(
+            "evaluate_interview_answer",
+            question=r.question,
+            user_answer=r.user_answer,
+            expected_concepts=r.expected_concepts,
+            proficiency=r.proficiency,
+        )
+        for r in reqs
+    ]
+    results = []
+    for future in pending:
+        try:
+            results.append(future.result())
+        except LLMBusyError:
+            for rest in pending:
+                rest.cancel()
+            raise
+        except Exception as e:
+            logger.exception("interview_evaluate_batch item failed: %s", e)
+            results.append({"error": str(e)})
+    return jsonify({"results": results})
+
+
 @app.route("/interview/next", methods=["POST"])
 def interview_next():
     """
-    Generate the next interview question.
+    Next interview question — from the session's batch when available,
+    otherwise generated on demand.
     Payload: { topic, proficiency, question_num, total_questions, asked_questions[] }
     """
-    data = request.get_json()
-    try:
-        q = interview_agent.call(
+    data = _json_body() or {}
+    question_num = data.get("question_num", 2)
+    kwargs = dict(topic=data.get("topic", "General Knowledge"),
+                  proficiency=proficiency_band(data.get("proficiency")),
+                  question_num=int(question_num),
+                  total=int(data.get("total_questions", 5)),
+                  asked_questions=data.get("asked_questions", []))
+    q = _claim_interview_question(kwargs["topic"], kwargs["proficiency"],
+                                  kwargs["asked_questions"])
+    if q is not None:
+        result = {"question": q, "question_num": question_num}
+        return _sse_done(result) if _wants_stream() else jsonify(result)
+    if _wants_stream():
+        return _sse_tool_response(
             "generate_interview_question",
-            topic=data.get("topic", "General Knowledge"),
-            proficiency=data.get("proficiency", "intermediate"),
-            question_num=int(data.get("question_num", 2)),
-            total=int(data.get("total_questions", 5)),
-            asked_questions=data.get("asked_questions", []),
+            shape=lambda q: {"question": q, "question_num": question_num}, **kwargs,
         )
-        return jsonify({"question": q, "question_num": data.get("question_num", 2)})
+    try:
+        q = agent.call("generate_interview_question", **kwargs)
+        return jsonify({"question": q, "question_num": question_num})
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
-        logging.exception("interview_next failed: %s", e)
+        logger.exception("interview_next failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/interview/analyze", methods=["POST"])
 def interview_analyze():
     """
-    Generate a comprehensive performance analysis after the interview.
+    Generate a comprehensive performance analysis after the interview
+    (SSE with ?stream=1, so the report can render while it is written).
     Payload: { topic, proficiency, history: [{question, user_answer, score, grade, concepts_missing}] }
     """
-    data = request.get_json(force=True)
+    data = _json_body() or {}
+    kwargs = dict(topic=data.get("topic", "General Knowledge"),
+                  interview_history=data.get("history", []),
+                  proficiency=proficiency_band(data.get("proficiency")))
+    if _wants_stream():
+        return _sse_tool_response("generate_interview_analysis", **kwargs)
     try:
-        analysis = interview_agent.call(
-            "generate_interview_analysis",
-            topic=data.get("topic", "General Knowledge"),
-            interview_history=data.get("history", []),
-            proficiency=data.get("proficiency", "intermediate"),
-        )
+        analysis = agent.call("generate_interview_analysis", **kwargs)
         return jsonify(analysis)
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
-        logging.exception("interview_analyze failed: %s", e)
+        logger.exception("interview_analyze failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -537,7 +1007,7 @@ def interview_analyze():
 @app.route("/session/save", methods=["POST"])
 def session_save():
     """Save an assessment session result manually from the frontend."""
-    data = request.get_json()
+    data = _json_body() or {}
     user_id = data.get("userId", "anonymous")
     a_type  = data.get("type", "quiz")
     topic   = data.get("topic", "General")
@@ -550,8 +1020,7 @@ def session_save():
         sid = save_assessment_session(user_id, a_type, topic, score, max_s, fb, meta)
         return jsonify({"status": "success", "session_id": sid})
     except Exception as e:
-        import logging
-        logging.exception("Failed to save session: %s", e)
+        logger.exception("Failed to save session: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/analytics/summary", methods=["GET"])
@@ -576,15 +1045,22 @@ def analytics_improvement():
     weak_skills = sorted(skills, key=lambda x: x["avg_score"])[:3]
     
     try:
-        plan = improvement_agent.call(
+        plan = agent.call(
             "generate_improvement_plan",
             low_performing_skills=[{"skill": s["skill"], "avg_score": s["avg_score"]} for s in weak_skills]
         )
         return jsonify(plan)
+    except (LLMBusyError, ToolArgumentError):
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # ══════════════════════════════════════════════════════════════════════════════
 if __name__ == "__main__":
-    app.run(debug=True, port=8000)
+    # Development only — in production run:  gunicorn -c gunicorn.conf.py main:app
+    # LLM-bound handlers block their thread for the whole Groq round-trip;
+    # serve each request on its own thread so one slow call never queues others.
+    # The reloader/debugger are opt-in (FLASK_DEBUG=1): they double-start the
+    # process and add per-request overhead.
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", port=8000, threaded=True)
 
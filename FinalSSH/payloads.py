@@ -0,0 +1,155 @@
+"""
+payloads.py
+───────────
+Typed request bodies for the hot routes.
+
+Each payload is a dataclass; parse(cls, data) turns a decoded JSON body into
+an instance in one pass — missing or null keys take the field default,
+values are coerced to the annotated type, and anything that cannot be
+coerced raises PayloadError (served as HTTP 422 by main.py).
+
+Proficiency bands are normalised (trimmed, lower-cased) so "Beginner" and
+"beginner " reach the tools as the enum value they validate against.
+
+Field names are snake_case; a field whose JSON key differs (the /submit
+payload is camelCase) declares it with  field(metadata={"key": "userId"}).
+"""
+
+from __future__ import annotations
+
+from dataclasses import MISSING, dataclass, field, fields
+from typing import Any, Callable, TypeVar, get_type_hints
+
+T = TypeVar("T")
+
+
+class PayloadError(ValueError):
+    """The request body does not match the expected payload shape."""
+
+
+# ── Coercion ──────────────────────────────────────────────────────────────────
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise TypeError("boolean")
+    return int(value)
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool):
+        raise TypeError("boolean")
+    return float(value)
+
+
+def _expect(kind: type) -> Callable[[Any], Any]:
+    def check(value: Any) -> Any:
+        if not isinstance(value, kind):
+            raise TypeError(type(value).__name__)
+        return value
+    return check
+
+
+_COERCE: dict[type, Callable[[Any], Any]] = {
+    int:   _to_int,
+    float: _to_float,
+    str:   _expect(str),
+    bool:  _expect(bool),
+    list:  _expect(list),
+    dict:  _expect(dict),
+}
+
+# Per-class plan built on first use: (attribute, json key, coerce, has_default).
+_PLANS: dict[type, list[tuple[str, str, Callable[[Any], Any], bool]]] = {}
+
+
+def _plan(cls: type) -> list[tuple[str, str, Callable[[Any], Any], bool]]:
+    plan = _PLANS.get(cls)
+    if plan is None:
+        hints = get_type_hints(cls)
+        plan = []
+        for f in fields(cls):
+            base = getattr(hints[f.name], "__origin__", hints[f.name])
+            has_default = f.default is not MISSING or f.default_factory is not MISSING
+            plan.append((f.name, f.metadata.get("key", f.name), _COERCE[base], has_default))
+        _PLANS[cls] = plan
+    return plan
+
+
+def parse(cls: type[T], data: Any) -> T:
+    """Build a `cls` payload from a decoded JSON body; raises PayloadError."""
+    if not isinstance(data, dict):
+        raise PayloadError("Request body must be a JSON object.")
+    kwargs: dict[str, Any] = {}
+    for name, key, coerce, has_default in _plan(cls):
+        value = data.get(key)
+        if value is None:
+            if not has_default:
+                raise PayloadError(f"'{key}' is required.")
+            continue
+        try:
+            kwargs[name] = coerce(value)
+        except (TypeError, ValueError) as e:
+            raise PayloadError(f"'{key}' has an invalid value ({e}).") from None
+    return cls(**kwargs)
+
+
+def proficiency_band(value: Any, default: str = "intermediate") -> Any:
+    """Trim and lower-case a proficiency string; empty → `default`.  Non-strings pass through."""
+    if not isinstance(value, str):
+        return default if value is None else value
+    return value.strip().lower() or default
+
+
+# ── Payloads ──────────────────────────────────────────────────────────────────
+
+@dataclass(slots=True)
+class AdaptiveStartReq:
+    topic: str = "General Knowledge"
+    proficiency: str = "intermediate"
+    user_id: str = field(default="anonymous", metadata={"key": "userId"})
+
+    def __post_init__(self) -> None:
+        self.proficiency = proficiency_band(self.proficiency)
+
+
+@dataclass(slots=True)
+class AdaptiveNextReq:
+    topic: str = "General Knowledge"
+    proficiency: str = "intermediate"
+    current_level: int = 1
+    current_difficulty: str = "medium"
+    last_score_pct: float = 50.0
+    time_taken_ms: int = 0
+    recent_score_pcts: list = field(default_factory=list)
+    asked_questions: list = field(default_factory=list)
+    user_id: str = field(default="anonymous", metadata={"key": "userId"})
+    session_id: str = field(default="", metadata={"key": "sessionId"})
+
+    def __post_init__(self) -> None:
+        self.proficiency = proficiency_band(self.proficiency)
+
+
+@dataclass(slots=True)
+class SubmitReq:
+    question_id: str = field(metadata={"key": "questionId"})
+    user_id: str = field(default="anonymous", metadata={"key": "userId"})
+    time_taken_ms: int = field(default=0, metadata={"key": "timeTakenMs"})
+    final_answer: str = field(default="", metadata={"key": "finalAnswer"})
+    confidence_level: str = field(default="MEDIUM", metadata={"key": "confidenceLevel"})
+    interaction_log: list = field(default_factory=list, metadata={"key": "interactionLog"})
+
+
+@dataclass(slots=True)
+class InterviewEvalReq:
+    question: str = ""
+    user_answer: str = ""
+    expected_concepts: list = field(default_factory=list)
+    proficiency: str = "intermediate"
+
+    def __post_init__(self) -> None:
+        self.proficiency = proficiency_band(self.proficiency)
+
+
+@dataclass(slots=True)
+class InterviewEvalBatchReq:
+    answers: list = field(default_factory=list)   # InterviewEvalReq-shaped dicts
@@ -0,0 +1,187 @@
+"""
+question_cache.py
+─────────────────
+Cross-session pool of generated questions.
+
+Question generation dominates adaptive-route latency, and the same
+(level, topic, difficulty, proficiency) combinations recur across users.
+QuestionPool keeps a bounded pool of recent questions per combination so a
+later request can be answered without an LLM round-trip.
+
+  QuestionPool.take(key, asked)  → a pooled question not yet asked, or None
+  QuestionPool.put(key, q)       → add a freshly generated question
+  QuestionPool.available(key, asked) → how many pooled questions could be served
+
+Each pooled question is served at most `max_serves` times and expires after
+`ttl` seconds, so pools keep turning over instead of pinning one question.
+
+With a `loader`/`saver` pair (db.load_pooled_questions / save_pooled_question)
+the pool is backed by SQLite: new questions are written through, and a key is
+warmed from the store the first time it is used, so pools survive restarts
+and are shared between worker processes.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+# loader(key, max_age, limit) → [(created_at unix time, question), ...]
+PoolLoader = Callable[[tuple, float, int], list[tuple[float, dict]]]
+PoolSaver  = Callable[[tuple, dict], None]
+
+logger = logging.getLogger(__name__)
+
+
+# Words that never change what a topic is about ("lists in python" is
+# "python lists").  Symbols inside a word are kept: "c++" is not "c".
+_TOPIC_STOPWORDS = frozenset({
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "with", "about", "using",
+})
+_TOPIC_WORD_RE = re.compile(r"[\w+#.]+")
+
+
+def topic_key(topic: str) -> str:
+    """
+    Canonical form of a topic for cache keys: casefolded, filler words
+    dropped, simple plurals singularised and word order ignored, so
+    "Python Lists", "python list" and "lists in python" share one key.
+    """
+    words = set()
+    for word in _TOPIC_WORD_RE.findall(topic.casefold()):
+        word = word.strip(".")
+        if not word or word in _TOPIC_STOPWORDS:
+            continue
+        if len(word) > 3 and word.isalpha() and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words)) or " ".join(topic.casefold().split())
+
+
+def pool_key(level: int, topic: str, difficulty: str, proficiency: str) -> tuple:
+    """Normalised pool key — topics phrased differently share a pool (see topic_key)."""
+    return (level, topic_key(topic), difficulty, proficiency)
+
+
+def question_text(q: dict) -> str:
+    """The text the frontend records in asked_questions for this question."""
+    return q.get("scenario") or q.get("question") or ""
+
+
+def was_asked(text: str, asked: list[str]) -> bool:
+    """
+    True if `text` is an entry of `asked` or starts with one.  Clients send
+    only the opening of a long L3 scenario, so an exact match would miss it.
+
+    >>> scenario = "Your team's payment service starts timing out at peak hours. " * 4
+    >>> was_asked(scenario, [scenario[:120]])
+    True
+    >>> was_asked(scenario, ["Your team's database fails over."])
+    False
+    """
+    return any(a and text.startswith(a) for a in asked)
+
+
+class QuestionPool:
+    """
+    Thread-safe LRU map of pool key → list of [expires_at, serves, question].
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 512,
+        max_per_key: int = 20,
+        max_serves: int = 5,
+        ttl: float = 3600.0,
+        loader: PoolLoader | None = None,
+        saver: PoolSaver | None = None,
+    ) -> None:
+        self.max_keys    = max_keys
+        self.max_per_key = max_per_key
+        self.max_serves  = max_serves
+        self.ttl         = ttl
+        self._loader     = loader
+        self._saver      = saver
+        self._pools: OrderedDict[tuple, list[list]] = OrderedDict()
+        # Keys already warmed from the loader (dropped again on eviction).
+        self._loaded: set[tuple] = set()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        while len(self._pools) > self.max_keys:
+            old, _ = self._pools.popitem(last=False)
+            self._loaded.discard(old)
+
+    def _warm(self, key: tuple) -> None:
+        """Merge stored questions for `key` into the pool on its first use."""
+        with self._lock:
+            if self._loader is None or key in self._loaded:
+                return
+            self._loaded.add(key)
+        try:
+            stored = self._loader(key, self.ttl, self.max_per_key)
+        except Exception:  # noqa: BLE001 — a cold pool is still a working pool
+            logger.exception("Loading pooled questions for %s failed.", key)
+            return
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            texts = {question_text(e[2]) for e in pool}
+            for created_at, q in reversed(stored):      # oldest first
+                if question_text(q) not in texts:
+                    pool.insert(0, [now + self.ttl - (wall - created_at), 0, q])
+            del pool[:-self.max_per_key]
+            self._pools.move_to_end(key)
+            self._evict()
+
+    def take(self, key: tuple, asked: list[str]) -> dict | None:
+        """Return a random pooled question not already asked (see was_asked)."""
+        self._warm(key)
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools.get(key)
+            if not pool:
+                return None
+            pool[:] = [e for e in pool if e[0] >= now]
+            fresh = [e for e in pool if not was_asked(question_text(e[2]), asked)]
+            if not fresh:
+                return None
+            entry = random.choice(fresh)
+            entry[1] += 1
+            if entry[1] >= self.max_serves:
+                pool.remove(entry)
+            self._pools.move_to_end(key)
+            return dict(entry[2])
+
+    def available(self, key: tuple, asked: list[str]) -> int:
+        """Number of unexpired pooled questions not already asked (see was_asked)."""
+        self._warm(key)
+        now = time.monotonic()
+        with self._lock:
+            return sum(
+                1 for e in self._pools.get(key, ())
+                if e[0] >= now and not was_asked(question_text(e[2]), asked)
+            )
+
+    def put(self, key: tuple, q: dict, served: bool = True) -> None:
+        """
+        Add a generated question; the oldest entries fall out when full.
+        `served` counts the delivery to the session it was generated for —
+        pass False for questions generated ahead of demand.
+        """
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            pool.append([time.monotonic() + self.ttl, int(served), dict(q)])
+            del pool[:-self.max_per_key]
+            self._pools.move_to_end(key)
+            self._evict()
+        if self._saver is not None:
+            self._saver(key, q)
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self._pools.values())
@@ -0,0 +1,193 @@
+"""
+throttle.py
+───────────
+Per-process admission control for Groq traffic.
+
+Without a gate, a burst of requests fans out into a burst of Groq calls; once
+Groq starts answering 429 the SDK retries each one, and the retries compound
+into latency cliffs for everyone.  LLMGate caps how many calls are in
+flight, how many start per minute and, optionally, how many tokens they
+spend per minute:
+
+  with LLM_GATE.slot():          # blocks up to `timeout` seconds
+      client.chat.completions.create(...)
+
+  async with LLM_GATE.aslot():   # same, without blocking the event loop
+      ...
+
+  LLM_GATE.spend(estimated_tokens)   # inside a slot, before the request
+  LLM_GATE.observe(response.headers) # after it: Groq's x-ratelimit-* headers
+
+Those headers report the account's remaining quota, which every worker
+process shares.  When it runs low the gate pauses new calls until Groq's
+reported reset instead of letting them run into 429s.
+
+When no slot (or token budget) frees up in time, LLMBusyError is raised —
+main.py serves it as HTTP 429 with a Retry-After header, so clients back off
+instead of piling on.
+
+Limits come from the environment:
+  GROQ_MAX_CONCURRENCY  (default 20)   calls in flight at once
+  GROQ_RPM              (default 600)  calls started per minute
+  GROQ_TPM              (default 0)    tokens spent per minute; 0 = no limit
+  GROQ_TOKENS_FLOOR     (default 2000) pause when fewer quota tokens remain
+  GROQ_GATE_TIMEOUT     (default 10)   seconds a caller may wait for a slot
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Mapping
+
+# Groq reset durations look like "7.66s", "2m59.56s" or "1h2m3s".
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS   = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_duration(text: str) -> float:
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in _DURATION_PART_RE.findall(text))
+
+
+class LLMBusyError(RuntimeError):
+    """No LLM slot became available in time; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"LLM capacity exhausted — retry in {self.retry_after}s.")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate     = rate
+        self.capacity = capacity
+        self._tokens  = capacity
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def _reserve(self, n: float) -> float:
+        """Take `n` tokens if available; else return the wait until they are."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= n:
+                self._tokens -= n
+                return 0.0
+            return (n - self._tokens) / self.rate
+
+    def acquire(self, timeout: float, n: float = 1.0) -> float:
+        """
+        Take `n` tokens (at most `capacity`), waiting at most `timeout` seconds.
+        Returns 0.0 on success, else the wait that would have been needed.
+        """
+        n = min(n, self.capacity)
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve(n)
+            if not wait:
+                return 0.0
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                return wait
+            time.sleep(wait)
+
+
+class LLMGate:
+    """Concurrency cap plus request and token rate limits around every LLM call."""
+
+    def __init__(self, max_concurrency: int, rpm: float, timeout: float,
+                 tpm: float = 0, tokens_floor: int = 2000) -> None:
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.tokens_floor = tokens_floor
+        self._paused_until = 0.0          # monotonic time; set by observe()
+        self._sem    = threading.BoundedSemaphore(max_concurrency)
+        # A burst of up to one second's worth of calls (at least one).
+        self._bucket = TokenBucket(rate=rpm / 60.0, capacity=max(1.0, rpm / 60.0))
+        # Token spend may burst up to a full minute's budget: one large
+        # prompt must fit, and the request bucket already smooths bursts.
+        self._token_bucket = TokenBucket(rate=tpm / 60.0, capacity=tpm) if tpm > 0 else None
+
+    def acquire(self) -> None:
+        """Claim a slot or raise LLMBusyError; pair with release()."""
+        deadline = time.monotonic() + self.timeout
+        if not self._sem.acquire(timeout=self.timeout):
+            raise LLMBusyError(self.timeout)
+        paused = self._paused_until - time.monotonic()
+        if paused > 0:
+            if paused > deadline - time.monotonic():
+                self._sem.release()
+                raise LLMBusyError(paused)
+            time.sleep(paused)
+        wait = self._bucket.acquire(max(0.0, deadline - time.monotonic()))
+        if wait:
+            self._sem.release()
+            raise LLMBusyError(wait)
+
+    def release(self) -> None:
+        self._sem.release()
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """
+        Read Groq's x-ratelimit-* response headers: with no requests left, or
+        fewer than `tokens_floor` tokens, pause new calls until the reported reset.
+        """
+        pause = 0.0
+        try:
+            if int(headers.get("x-ratelimit-remaining-requests", 1)) <= 0:
+                pause = _parse_duration(headers.get("x-ratelimit-reset-requests", ""))
+            if int(headers.get("x-ratelimit-remaining-tokens", self.tokens_floor)) < self.tokens_floor:
+                pause = max(pause, _parse_duration(headers.get("x-ratelimit-reset-tokens", "")))
+        except ValueError:
+            return
+        if pause:
+            until = time.monotonic() + pause
+            if until > self._paused_until:          # a float store is atomic
+                self._paused_until = until
+
+    def spend(self, tokens: float) -> None:
+        """
+        Charge an estimated `tokens` against the per-minute token budget,
+        waiting up to `timeout` seconds; raise LLMBusyError if it stays spent.
+        A no-op when GROQ_TPM is unset.
+        """
+        if self._token_bucket is None:
+            return
+        wait = self._token_bucket.acquire(self.timeout, tokens)
+        if wait:
+            raise LLMBusyError(wait)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        await asyncio.to_thread(self.acquire)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+LLM_GATE = LLMGate(
+    max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "20")),
+    rpm=float(os.getenv("GROQ_RPM", "600")),
+    timeout=float(os.getenv("GROQ_GATE_TIMEOUT", "10")),
+    tpm=float(os.getenv("GROQ_TPM", "0")),
+    tokens_floor=int(os.getenv("GROQ_TOKENS_FLOOR", "2000")),
+)
@@ -11,8 +11,17 @@ registered with a QuizAgent.  To add a new capability:
 """
 
 import json
+import logging
+import os
+import re
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, Callable, Hashable, Sequence
+
+from groq import BadRequestError
+
+from throttle import LLM_GATE
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -28,36 +37,502 @@ class Tool:
                   (used by the LLM orchestrator when calling tools).
     func        : The Python callable that implements the tool.
                   Must accept keyword arguments matching `parameters`.
+    cacheable   : True if identical arguments may be answered from
+                  QuizAgent's short-lived response cache (deterministic
+                  evaluators, not question generators that must vary).
+    parallel_safe : True if the tool may run concurrently with other tool
+                  calls from the same orchestrator turn (no shared state).
+    timeout     : Seconds QuizAgent.run waits for a result before reporting
+                  a tool timeout; None uses QuizAgent.TOOL_TIMEOUT.
+    cache_key   : For cacheable tools, maps the call's arguments to the
+                  response-cache key; None keys on the exact arguments.
+                  Evaluators use normalized_cache_key so answers that
+                  differ only in case or whitespace share one grading.
+    gates_itself : True if the tool makes several Groq requests and takes
+                  an LLM_GATE slot around each one itself; QuizAgent then
+                  runs it without a slot of its own.  False: QuizAgent
+                  holds one slot for the whole invocation.
     """
     name: str
     description: str
     parameters: dict
     func: Callable[..., Any]
+    cacheable: bool = False
+    parallel_safe: bool = False
+    timeout: float | None = None
+    cache_key: Callable[[dict], Hashable] | None = None
+    gates_itself: bool = False
+
+
+# ── Argument validation ───────────────────────────────────────────────────────
+
+# JSON-Schema "type" → accepted Python types (bool is excluded from numbers).
+_JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string":  (str,),
+    "integer": (int,),
+    "number":  (int, float),
+    "boolean": (bool,),
+    "array":   (list, tuple),
+    "object":  (dict,),
+    "null":    (type(None),),
+}
+
+
+def compile_validator(schema: dict, path: str = "") -> Callable[[Any], None]:
+    """
+    Compile the subset of JSON Schema used by tool PARAMETERS and reply
+    shapes (type, enum, properties, required, items, minItems,
+    additionalProperties: false) into a chain
+    of closures.  The schema is walked once here; the returned validator
+    only runs the checks that apply and raises ValueError on the first
+    mismatch.  Unsupported keywords are ignored.
+    """
+    checks: list[Callable[[Any], None]] = []
+    where = path or "arguments"
+
+    json_type = schema.get("type")
+    if isinstance(json_type, str) and json_type in _JSON_TYPES:
+        expected = _JSON_TYPES[json_type]
+        reject_bool = json_type in ("integer", "number")
+
+        def check_type(value: Any) -> None:
+            if not isinstance(value, expected) or (reject_bool and isinstance(value, bool)):
+                raise ValueError(f"{where}: expected {json_type}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = tuple(schema["enum"])
+
+        def check_enum(value: Any) -> None:
+            if value not in allowed:
+                raise ValueError(f"{where}: {value!r} is not one of {list(allowed)}")
+        checks.append(check_enum)
+
+    required = tuple(schema.get("required", ()))
+    if required:
+        def check_required(value: Any) -> None:
+            if isinstance(value, dict):
+                missing = [k for k in required if k not in value]
+                if missing:
+                    raise ValueError(f"{where}: missing required {missing}")
+        checks.append(check_required)
+
+    props = {
+        name: compile_validator(sub, f"{path}.{name}" if path else name)
+        for name, sub in schema.get("properties", {}).items()
+    }
+    closed = schema.get("additionalProperties") is False
+    if props or closed:
+        def check_properties(value: Any) -> None:
+            if not isinstance(value, dict):
+                return
+            for key, item in value.items():
+                sub = props.get(key)
+                if sub is not None:
+                    sub(item)
+                elif closed:
+                    raise ValueError(f"{where}: unexpected property {key!r}")
+        checks.append(check_properties)
+
+    min_items = schema.get("minItems")
+    if isinstance(min_items, int):
+        def check_min_items(value: Any) -> None:
+            if isinstance(value, (list, tuple)) and len(value) < min_items:
+                raise ValueError(f"{where}: expected at least {min_items} item(s)")
+        checks.append(check_min_items)
+
+    if isinstance(schema.get("items"), dict):
+        item_check = compile_validator(schema["items"], f"{where}[]")
+
+        def check_items(value: Any) -> None:
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    item_check(item)
+        checks.append(check_items)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def validate(value: Any) -> None:
+        for check in checks:
+            check(value)
+    return validate
 
 
 # ── Shared utilities ──────────────────────────────────────────────────────────
 
+# Per-token callback used by tools that support streaming (see complete_text).
+TokenCallback = Callable[[str], None]
+
+_JSON_OBJECT = {"type": "json_object"}
+
+# ── Model tiers ──
+# Short, tightly-formatted calls (authoring one question, grading one answer)
+# run on a small fast model; open-ended analysis and L3 stay on the large one.
+# Easy MCQs and easy beginner scenarios use the smaller gpt-oss model.
+# Each tier can be overridden with GROQ_MODEL_<TIER> (e.g. for A/B runs).
+LARGE_MODEL = "openai/gpt-oss-120b"
+MODELS: dict[str, str] = {
+    tier: os.getenv(f"GROQ_MODEL_{tier.upper()}", default)
+    for tier, default in {
+        "question":   "llama-3.1-8b-instant",
+        "eval_short": "llama-3.1-8b-instant",
+        "mcq":        LARGE_MODEL,
+        "mcq_easy":   "openai/gpt-oss-20b",
+        "analysis":   LARGE_MODEL,
+        "l3":         LARGE_MODEL,
+        "l3_easy":    "openai/gpt-oss-20b",
+    }.items()
+}
+
+# Only these model families accept `reasoning_effort`; it is dropped for others.
+_REASONING_MODEL_PREFIXES = ("openai/gpt-oss", "qwen/")
+
+
+def _estimate_tokens(create_kwargs: dict) -> int:
+    prompt_chars = sum(len(m.get("content") or "") for m in create_kwargs.get("messages", ()))
+    ceiling = create_kwargs.get("max_completion_tokens") or create_kwargs.get("max_tokens") or 1024
+    return prompt_chars // 4 + ceiling
+
+
+def _log_cache_usage(completion: Any) -> None:
+    """Debug-log how many prompt tokens the provider served from its cache."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    usage   = getattr(completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached  = getattr(details, "cached_tokens", None)
+    if cached is not None:
+        logger.debug("prompt cache: %s/%s tokens cached",
+                     cached, getattr(usage, "prompt_tokens", "?"))
+
+
+def complete_text(groq_client, on_token: TokenCallback | None = None, *,
+                  json_mode: bool = False, **create_kwargs: Any) -> str:
+    """
+    Run one chat completion and return the message content, stripped.
+
+    With `on_token`, the completion is streamed and every content delta is
+    passed to the callback as it arrives (routes relay these as SSE), while
+    the full text is still returned for parsing.  Without it, this is a
+    plain non-streaming call.
+
+    `json_mode` asks the API for a JSON object (response_format), so the
+    reply parses without repair; it applies to non-streamed calls only, as
+    Groq's JSON mode does not stream.
+
+    The call's estimated token cost (prompt at ~4 characters per token plus
+    the completion ceiling) is charged to LLM_GATE's per-minute token budget.
+    """
+    if not create_kwargs.get("model", "").startswith(_REASONING_MODEL_PREFIXES):
+        create_kwargs.pop("reasoning_effort", None)
+    LLM_GATE.spend(_estimate_tokens(create_kwargs))
+    logger.debug("Groq completion on %s", create_kwargs.get("model"))
+    # The raw response exposes Groq's rate-limit headers to the gate.
+    create = groq_client.chat.completions.with_raw_response.create
+    if on_token is None:
+        if json_mode:
+            create_kwargs["response_format"] = _JSON_OBJECT
+        raw = create(stream=False, **create_kwargs)
+        LLM_GATE.observe(raw.headers)
+        completion = raw.parse()
+        _log_cache_usage(completion)
+        return (completion.choices[0].message.content or "").strip()
+
+    raw = create(stream=True, **create_kwargs)
+    LLM_GATE.observe(raw.headers)
+    parts: list[str] = []
+    for chunk in raw.parse():
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    return "".join(parts).strip()
+
+
+# Replies that carry no answer at all (compared after casefolding and
+# dropping punctuation); evaluators score these 0 without an LLM call.
+_NON_ANSWERS = frozenset({
+    "idk", "i dont know", "i don't know", "dont know", "don't know", "no idea",
+    "not sure", "skip", "pass", "none", "nothing", "n a", "na", "no answer",
+})
+_NON_WORD_RE = re.compile(r"[^\w\s']+")
+
+
+def is_trivial_answer(text: str) -> bool:
+    """True for a blank answer or a stock non-answer ("idk", "skip", "pass", …)."""
+    norm = " ".join(_NON_WORD_RE.sub(" ", text.casefold()).split())
+    return not norm or norm in _NON_ANSWERS
+
+
+# Opening of every question generator's system prompt, byte-identical across
+# tools: one adaptive session switches between MCQ, L2 and L3 generation, and
+# a shared leading block lets the provider's prompt cache match across them.
+JSON_ONLY_HEADER = (
+    "Always respond with ONLY one valid JSON object: no markdown, no code fences, "
+    "no text before or after it. Use double-quoted strings and no trailing commas.\n\n"
+)
+
+
+def calibration_block(title: str, table: dict[str, str]) -> str:
+    """
+    Every entry of a calibration table as a system-prompt section.  Carrying
+    all of them in the (static) system message, with the user message only
+    naming the one to apply, keeps the cached prompt prefix identical
+    across tiers and proficiencies.
+    """
+    return f"\n{title} — apply the one named in the request:\n" + "".join(
+        f"- {name}: {text}\n" for name, text in table.items())
+
+
+def calibration_key(value: str, table: dict[str, str], default: str) -> str:
+    """The `table` key `value` names (case-insensitively), else `default`."""
+    key = value.strip().casefold()
+    return key if key in table else default
+
+
+def session_prefix(topic: str, proficiency: str) -> str:
+    """
+    Canonical opening lines of a session's user prompts.  Every call for the
+    same (topic, proficiency) starts with the same bytes, which the
+    provider's prompt-prefix cache matches on from call 2 onwards.
+    """
+    return f"Topic: {topic.strip()}\nProficiency level: {proficiency.strip().casefold()}\n"
+
+
+# Most asked-question texts a generator prompt repeats back to the model.
+ASKED_PROMPT_LIMIT = 20
+
+
+def recent_unique(items: Sequence[str], limit: int = ASKED_PROMPT_LIMIT) -> list[str]:
+    """
+    Distinct entries of `items` (first occurrence kept, order preserved),
+    capped to the `limit` most recent — bounds the "do not repeat" block of a
+    prompt when the client resends duplicates or long histories.
+    """
+    return list(dict.fromkeys(items))[-limit:]
+
+
+# Character budget (~400 tokens) for the asked-questions block of a prompt.
+ASKED_PROMPT_CHAR_BUDGET = 1600
+
+
+def asked_lines(items: Sequence[str], clip: int | None = None,
+                limit: int = ASKED_PROMPT_LIMIT) -> str:
+    """
+    The "do not repeat" block of a generator prompt: one "- text" line per
+    distinct recent entry (oldest first, each clipped to `clip` characters),
+    bounded by `limit` entries and ASKED_PROMPT_CHAR_BUDGET characters.
+    Entries that do not fit are summarised as a count — the model only
+    needs a sample to steer away from repeats.
+    """
+    unique = list(dict.fromkeys(items))
+    kept: list[str] = []
+    used = 0
+    for text in reversed(unique[-limit:]):
+        if clip is not None and len(text) > clip:
+            text = text[:clip] + "…"
+        used += len(text) + 3
+        if used > ASKED_PROMPT_CHAR_BUDGET and kept:
+            break
+        kept.append(text)
+    lines = [f"- {text}" for text in reversed(kept)]
+    omitted = len(unique) - len(kept)
+    if omitted:
+        lines.insert(0, f"- …and {omitted} earlier question{'s' if omitted > 1 else ''}")
+    return "\n".join(lines)
+
+
+_SHINGLE_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, n: int = 3) -> frozenset[tuple[str, ...]]:
+    """The set of casefolded word n-grams of `text`."""
+    words = _SHINGLE_WORD_RE.findall(text.casefold())
+    return frozenset(zip(*(words[i:] for i in range(n))))
+
+
+def find_repeat(text: str, previous: Sequence[str], threshold: float = 0.6) -> str | None:
+    """
+    The first entry of `previous` that `text` near-duplicates, else None.
+    Overlap is shared word 3-grams over the smaller set, so a clipped
+    opening still matches the full text it was cut from.
+    """
+    mine = shingles(text)
+    if not mine:
+        return None
+    for prev in previous:
+        theirs = shingles(prev)
+        if theirs and len(mine & theirs) >= threshold * min(len(mine), len(theirs)):
+            return prev
+    return None
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    Return the body of a ```-fenced model response (language tag dropped);
+    unfenced text is returned unchanged.  A missing closing fence (truncated
+    output) keeps everything after the opening one.
+    """
+    if not text.startswith("```"):
+        return text
+    end = text.rfind("```")
+    if end == 0:
+        end = len(text)
+    nl = text.find("\n", 3, end)
+    if nl == -1:                                # ```json{...}``` on one line
+        return text[3:end].removeprefix("json").strip()
+    return text[nl + 1:end].strip()
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def normalized_cache_key(kwargs: dict) -> str:
+    """
+    Response-cache key that ignores case and runs of whitespace in every
+    string argument, so "Paris " and "paris" (typical transcription or
+    typing variance) hit the same cached evaluation.
+    """
+    return json.dumps(_normalize(kwargs), sort_keys=True, default=str)
+
+
+# Complete string literals (escape-aware) and the structural brackets left
+# once they are removed — both scans run in C instead of a per-char loop.
+_JSON_STRING_RE  = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_JSON_BRACKET_RE = re.compile(r"[\[\]{}]")
+_JSON_CLOSERS    = {"[": "]", "{": "}"}
+_JSON_TRAILING_COMMA_RE = re.compile(r",(\s*[\]}])")
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, outside string literals."""
+    parts: list[str] = []
+    pos = 0
+    for m in _JSON_STRING_RE.finditer(text):
+        parts.append(_JSON_TRAILING_COMMA_RE.sub(r"\1", text[pos:m.start()]))
+        parts.append(m.group())
+        pos = m.end()
+    parts.append(_JSON_TRAILING_COMMA_RE.sub(r"\1", text[pos:]))
+    return "".join(parts)
+
+
 def repair_json(text: str) -> dict:
     """
     Best-effort JSON repair for truncated model responses.
-    Tries json.loads first; on failure, closes any open strings / brackets and retries.
+    Tries json.loads first — the common, well-formed case costs one C-level
+    parse.  On failure, closes any open string, completes a dangling key,
+    closes open brackets, drops trailing commas and retries once.  Brackets,
+    commas and quotes inside string values are ignored.
     Raises json.JSONDecodeError if the text is still invalid after repair.
     """
     try:
         return json.loads(text)
     except json.JSONDecodeError:
-        rep = text.rstrip()
-        while rep and rep[-1] in (",", ":", '"'):
+        pass
+
+    rep  = text.rstrip()
+    bare = _JSON_STRING_RE.sub("", rep)
+    if '"' in bare:                        # truncated inside a string
+        if rep.endswith("\\"):
             rep = rep[:-1]
-        if rep.count('"') % 2 == 1:
-            rep += '"'
-        opens  = {"[": "]", "{": "}"}
-        closes = {"]", "}"}
-        stack: list[str] = []
-        for ch in rep:
-            if ch in opens:
-                stack.append(opens[ch])
-            elif ch in closes and stack:
-                stack.pop()
-        rep += "".join(reversed(stack))
-        return json.loads(rep)
+        rep += '"'
+        bare = _JSON_STRING_RE.sub("", rep)
+    rep = rep.rstrip(", \t\r\n")
+    if rep.endswith(":"):
+        rep += " null"
+
+    stack: list[str] = []
+    for ch in _JSON_BRACKET_RE.findall(bare):
+        if ch in _JSON_CLOSERS:
+            stack.append(_JSON_CLOSERS[ch])
+        elif stack:
+            stack.pop()
+    return json.loads(_strip_trailing_commas(rep + "".join(reversed(stack))))
+
+
+def parse_llm_json(text: str, empty_error: str = "Groq returned an empty response.") -> Any:
+    """
+    Decode a model's JSON reply: drop a ```-fence, reject an empty reply with
+    ValueError(empty_error), then parse — repairing truncated output if the
+    plain parse fails.  The one place every tool turns model text into data.
+    """
+    text = strip_code_fence(text)
+    if not text:
+        raise ValueError(empty_error)
+    return repair_json(text)
+
+
+def complete_validated(groq_client, validate: Callable[[Any], None],
+                       ceilings: Sequence[int], on_token: TokenCallback | None = None, *,
+                       empty_error: str = "Groq returned an empty response.",
+                       **create_kwargs: Any) -> Any:
+    """
+    Run a JSON-mode completion whose parsed reply must pass `validate`
+    (see compile_validator).  A rejected reply — typically one cut off at
+    the token ceiling — is requested again with the next, larger ceiling in
+    `ceilings` (not streamed); the last rejection is raised as ValueError.
+    """
+    for attempt, ceiling in enumerate(ceilings):
+        text = complete_text(groq_client, on_token if attempt == 0 else None,
+                             json_mode=True, max_completion_tokens=ceiling,
+                             **create_kwargs)
+        try:
+            data = parse_llm_json(text, empty_error)
+            validate(data)
+            return data
+        except ValueError as e:
+            if attempt == len(ceilings) - 1:
+                raise
+            logger.warning("Reply from %s rejected (%s); retrying with %d tokens.",
+                           create_kwargs.get("model"), e, ceilings[attempt + 1])
+    raise ValueError("No completion attempted.")      # empty `ceilings`
+
+
+def complete_json(groq_client, tier: str, on_token: TokenCallback | None = None, *,
+                  required: tuple[str, ...] = (),
+                  empty_error: str = "Groq returned an empty response.",
+                  **create_kwargs: Any) -> dict:
+    """
+    Run a JSON-mode completion on the model for `tier` (see MODELS) and
+    return the parsed object, which must be a dict holding every `required` key.
+
+    When a smaller model's reply is rejected — unparseable, missing a key, or
+    refused by the API's JSON validation — the call is repeated once on
+    LARGE_MODEL (not streamed), so the happy path stays cheap without
+    losing accuracy.
+    """
+    model = MODELS[tier]
+    try:
+        return _complete_checked(groq_client, on_token, model, required,
+                                 empty_error, create_kwargs)
+    except (ValueError, BadRequestError) as e:
+        if model == LARGE_MODEL:
+            raise
+        logger.warning("%s reply from %s rejected (%s); retrying on %s.",
+                       tier, model, e, LARGE_MODEL)
+    return _complete_checked(groq_client, None, LARGE_MODEL, required,
+                             empty_error, create_kwargs)
+
+
+def _complete_checked(groq_client, on_token: TokenCallback | None, model: str,
+                      required: tuple[str, ...], empty_error: str,
+                      create_kwargs: dict) -> dict:
+    text = complete_text(groq_client, on_token, json_mode=True,
+                         model=model, **create_kwargs)
+    data = parse_llm_json(text, empty_error)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object from {model}.")
+    missing = [key for key in required if key not in data]
+    if missing:
+        raise ValueError(f"Reply from {model} is missing {', '.join(missing)}.")
+    return data
@@ -5,7 +5,9 @@ Generates a personalised, encouraging study-coach note after a quiz session.
 Exports create_feedback_tool(groq_client) → Tool.
 """
 
-from tools import Tool
+from tools import Tool, TokenCallback, complete_text
+
+_SYSTEM_MSG = {"role": "system", "content": "You are a supportive and insightful study coach."}
 
 # ── JSON Schema for the tool ───────────────────────────────────────────────────
 FEEDBACK_PARAMETERS: dict = {
@@ -37,25 +39,22 @@ FEEDBACK_PARAMETERS: dict = {
 
 # ── Private implementation ─────────────────────────────────────────────────────
 
-def _generate_feedback(groq_client, topic: str, history: list[dict]) -> str:
-    """Build a personalised study note from the quiz history."""
-    lines: list[str] = []
-    for i, h in enumerate(history, 1):
-        status   = "✅ Correct" if h.get("isCorrect") else "❌ Wrong"
-        time_s   = round(h.get("timeTaken", 0) / 1000, 1)
-        diff     = h.get("difficulty", "medium")
-        q_text   = h.get("question", "")
-        selected = h.get("selected", "?")
-        correct  = h.get("correct", "?")
-        line = f"Q{i} [{diff.upper()}] {status} in {time_s}s — \"{q_text}\""
-        if not h.get("isCorrect"):
-            line += f" (chose {selected}, correct was {correct})"
-        lines.append(line)
-
-    summary_block = "\n".join(lines)
-    score = sum(1 for h in history if h.get("isCorrect"))
-
-    prompt = f"""\
+# Status label indexed by the answer's correctness (False → 0, True → 1).
+_STATUS = ("❌ Wrong", "✅ Correct")
+
+
+def _build_feedback_prompt(topic: str, history: list[dict]) -> str:
+    """The study-coach prompt for one quiz history (the only place it is built)."""
+    results = [bool(h.get("isCorrect")) for h in history]
+    score   = sum(results)
+    summary_block = "\n".join([
+        f"Q{i} [{h.get('difficulty', 'medium').upper()}] {_STATUS[ok]} "
+        f"in {h.get('timeTaken', 0) / 1000:.1f}s — \"{h.get('question', '')}\""
+        + ("" if ok else f" (chose {h.get('selected', '?')}, correct was {h.get('correct', '?')})")
+        for i, (h, ok) in enumerate(zip(history, results), 1)
+    ])
+
+    return f"""\
 A student just completed a {len(history)}-question adaptive MCQ quiz on "{topic}".
 They scored {score}/{len(history)}.
 
@@ -71,22 +70,24 @@ Write a short, encouraging, and personalised study note (3–5 sentences) for th
 Write in second person ("You did well on…"). Be specific — reference the actual topics from \
 the questions they got wrong. Do NOT use bullet points or headers, just flowing paragraphs."""
 
-    completion = groq_client.chat.completions.create(
+
+def _generate_feedback(groq_client, topic: str, history: list[dict],
+                       on_token: TokenCallback | None = None) -> str:
+    """Build a personalised study note from the quiz history (streamed with `on_token`)."""
+    prompt = _build_feedback_prompt(topic, history)
+    return complete_text(
+        groq_client, on_token,
         model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": "You are a supportive and insightful study coach."},
-            {"role": "user",   "content": prompt},
-        ],
+        messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
         temperature=1,
-        max_completion_tokens=400,
+        # 3–5 sentences (~150 tokens) plus low-effort reasoning, which
+        # counts against the same ceiling.
+        max_completion_tokens=300,
         top_p=1,
-        reasoning_effort="medium",
-        stream=False,
+        reasoning_effort="low",
         stop=None,
     )
 
-    return (completion.choices[0].message.content or "").strip()
-
 
 # ── Public factory ─────────────────────────────────────────────────────────────
 
@@ -97,8 +98,9 @@ def create_feedback_tool(groq_client) -> Tool:
     Usage in main.py:
         agent.register(create_feedback_tool(client))
     """
-    def func(topic: str, history: list[dict]) -> dict:
-        text = _generate_feedback(groq_client, topic, history)
+    def func(topic: str, history: list[dict],
+             on_token: TokenCallback | None = None) -> dict:
+        text = _generate_feedback(groq_client, topic, history, on_token)
         return {"feedback": text}
 
     return Tool(
@@ -110,4 +112,6 @@ def create_feedback_tool(groq_client) -> Tool:
         ),
         parameters=FEEDBACK_PARAMETERS,
         func=func,
+        cacheable=True,
+        parallel_safe=True,
     )
@@ -3,10 +3,54 @@ import json
 import logging
 from typing import Any
 from groq import Groq
-from tools import Tool
+from cache import MISSING, TTLCache
+from tools import Tool, complete_text, parse_llm_json
 
 logger = logging.getLogger(__name__)
 
+# Compact, UTF-8 JSON for the prompt payload: no whitespace after separators
+# means fewer prompt tokens.  Built once — json.dumps() with options would
+# construct a new encoder on every call.
+_encode_compact = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+# Plans depend only on which skills are weak and roughly how weak, so they
+# are shared across users for an hour, keyed by _skills_key().  This is the
+# tool's only cache (it is not Tool.cacheable); each caller's own skill names
+# and scores are written back over the shared plan by _personalise().
+PLAN_CACHE_SIZE = 2048
+PLAN_CACHE_TTL  = 3600.0
+
+
+def _skill_name(s: dict) -> str:
+    return str(s.get("skill", "")).strip().lower()
+
+
+def _skills_key(low_performing_skills: list[dict]) -> tuple:
+    """Order-, case- and rounding-insensitive fingerprint of a skill list."""
+    return tuple(sorted(
+        (_skill_name(s), round(s.get("avg_score") or 0))
+        for s in low_performing_skills
+    ))
+
+
+def _personalise(plan: dict, low_performing_skills: list[dict]) -> dict:
+    """
+    Copy of `plan` whose skills_analysis entries carry the caller's own
+    `skill` spelling and exact `avg_score`, not those of whoever filled the
+    cache.  The cached plan itself is never mutated.
+    """
+    analysis = plan.get("skills_analysis")
+    if not isinstance(analysis, list):
+        return plan
+    by_name = {_skill_name(s): s for s in low_performing_skills}
+    out = []
+    for item in analysis:
+        src = by_name.get(_skill_name(item)) if isinstance(item, dict) else None
+        if src is not None:
+            item = {**item, "skill": src.get("skill"), "avg_score": src.get("avg_score")}
+        out.append(item)
+    return {**plan, "skills_analysis": out}
+
 IMPROVEMENT_SYSTEM_PROMPT = """
 You are a highly experienced Educational Mentor and Study Coach.
 Your task is to analyze a student's weak skills and provide a highly targeted improvement plan.
@@ -41,7 +85,14 @@ You must return ONLY a JSON object with the following structure:
 }
 """
 
+# Built once; each call only adds the user message.
+_SYSTEM_MSG    = {"role": "system", "content": IMPROVEMENT_SYSTEM_PROMPT}
+_PROMPT_PREFIX = "Analyze these weak skills and generate a study plan:\n"
+
+
 def create_improvement_tool(client: Groq) -> Tool:
+    plans = TTLCache(maxsize=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL)
+
     def generate_improvement_plan(low_performing_skills: list[dict]) -> dict:
         """
         Generates a targeted study plan and resource list for weak skills.
@@ -53,19 +104,28 @@ def create_improvement_tool(client: Groq) -> Tool:
                 "overall_strategy": "Keep practicing! Take more assessments to identify areas for improvement."
             }
 
-        prompt = f"Analyze these weak skills and generate a study plan:\n{json.dumps(low_performing_skills)}"
+        key = _skills_key(low_performing_skills)
+        plan = plans.get(key)
+        if plan is not MISSING:
+            return _personalise(plan, low_performing_skills)
+
+        prompt = _PROMPT_PREFIX + _encode_compact(low_performing_skills)
         
         try:
-            resp = client.chat.completions.create(
+            text = complete_text(
+                client,
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": IMPROVEMENT_SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
+                json_mode=True,
+                messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
+                temperature=0.3,
+                # ~400 tokens per skill entry plus the overall strategy.
+                max_completion_tokens=300 + 450 * len(low_performing_skills),
             )
-            return json.loads(resp.choices[0].message.content)
+            plan = parse_llm_json(text, "Groq returned an empty improvement plan.")
+            if not isinstance(plan, dict):
+                raise ValueError("Expected a JSON object from the improvement model.")
+            plans.set(key, plan)
+            return _personalise(plan, low_performing_skills)
         except Exception as e:
             logger.exception("Improvement tool failed")
             return {"error": str(e)}
@@ -89,5 +149,6 @@ def create_improvement_tool(client: Groq) -> Tool:
             },
             "required": ["low_performing_skills"]
         },
-        func=generate_improvement_plan
+        func=generate_improvement_plan,
+        parallel_safe=True,
     )
@@ -1,17 +1,25 @@
 """
 tools/interview_tool.py
 ────────────────────────
-AI Interview Agent — Three tools for a one-on-one spoken assessment.
+AI Interview Agent — Four tools for a one-on-one spoken assessment.
 
-  1. generate_interview_question  — Creates a verbal-style open-ended question
-  2. evaluate_interview_answer    — Semantic analysis of the spoken/typed response
-  3. generate_interview_analysis  — Final comprehensive performance report
+  1. generate_interview_question        — Creates a verbal-style open-ended question
+  2. generate_interview_question_batch  — The rest of a session's questions in one call
+  3. evaluate_interview_answer          — Semantic analysis of the spoken/typed response
+  4. generate_interview_analysis        — Final comprehensive performance report
 
-Uses openai/gpt-oss-120b for all generation. Whisper transcription
-is handled directly in the Flask route (not a tool).
+Models come from tools.MODELS: the "question" tier for question writing,
+"eval_short" for grading answers, "analysis" for the final report.  Whisper
+transcription is handled directly in the Flask route (not a tool).
 """
 
-from tools import Tool, repair_json
+from typing import Sequence
+
+from tools import (
+    ASKED_PROMPT_LIMIT, MODELS, Tool, TokenCallback, asked_lines, complete_json,
+    complete_text, is_trivial_answer, normalized_cache_key, parse_llm_json,
+    session_prefix,
+)
 
 # ── System Prompts ──────────────────────────────────────────────────────────────
 
@@ -33,6 +41,34 @@ Respond with ONLY valid JSON, no markdown:
   "category": "conceptual|practical|problem-solving|scenario"
 }"""
 
+_BATCH_QUESTION_PROMPT = """\
+You are an expert technical interviewer conducting a one-on-one spoken assessment.
+Generate the requested number of engaging, open-ended interview questions for
+one session, in the order they will be asked.
+
+Rules:
+- Each must encourage a 1-3 minute spoken explanation (not a yes/no answer)
+- Length and complexity should match the proficiency level and grow gradually
+  from the first question to the last
+- Every question must be meaningfully different from the others and from
+  previously asked questions
+- Suitable for verbal delivery—conversational, not textbook-style
+
+Respond with ONLY valid JSON, no markdown:
+{
+  "questions": [
+    {
+      "question": "The full question text",
+      "expected_concepts": ["key concept 1", "key concept 2", "key concept 3"],
+      "hint": "A subtle one-line hint (shown only on request)",
+      "category": "conceptual|practical|problem-solving|scenario"
+    }
+  ]
+}"""
+
+# Upper bound on questions per batched call (the session slider tops out at 10).
+MAX_QUESTION_BATCH = 10
+
 _EVAL_PROMPT = """\
 You are an expert AI evaluator performing semantic analysis on a candidate's spoken answer.
 
@@ -82,90 +118,128 @@ Respond with ONLY valid JSON, no markdown:
   ]
 }"""
 
+# System messages are sent unchanged on every call — built once.
+_QUESTION_MSG = {"role": "system", "content": _QUESTION_PROMPT}
+_BATCH_MSG    = {"role": "system", "content": _BATCH_QUESTION_PROMPT}
+_EVAL_MSG     = {"role": "system", "content": _EVAL_PROMPT}
+_ANALYSIS_MSG = {"role": "system", "content": _ANALYSIS_PROMPT}
+
 
 # ── Core functions ──────────────────────────────────────────────────────────────
 
 def _gen_question(client, topic: str, proficiency: str, question_num: int,
-                  total: int, asked: list[str]) -> dict:
-    asked_text = "\n".join(f"- {q}" for q in asked) if asked else "None yet."
+                  total: int, asked: Sequence[str],
+                  on_token: TokenCallback | None = None) -> dict:
+    asked_text = asked_lines(asked) if asked else "None yet."
+    # Session-constant lines first, per-turn lines last: consecutive calls
+    # share the longest possible prompt prefix (provider-side prefix caching).
     msg = (
-        f"Topic: {topic}\n"
-        f"Proficiency level: {proficiency}\n"
+        session_prefix(topic, proficiency) +
+        "Generate the next interview question. Make it meaningfully different from previous ones.\n"
         f"This is question {question_num} of {total}.\n"
-        f"Previously asked questions:\n{asked_text}\n\n"
-        "Generate the next interview question. Make it meaningfully different from previous ones."
+        f"Previously asked questions:\n{asked_text}"
+    )
+    return complete_json(
+        client, "question", on_token,
+        required=("question",),
+        messages=[_QUESTION_MSG, {"role": "user", "content": msg}],
+        # Question writing needs little deliberation: low effort leaves most
+        # of the ceiling to the ~150-token answer.
+        temperature=0.85, max_completion_tokens=500, top_p=1,
+        reasoning_effort="low",
+    )
+
+
+def _gen_question_batch(client, topic: str, proficiency: str, n: int,
+                        asked: Sequence[str]) -> list[dict]:
+    """Generate the next `n` questions of a session in one call."""
+    n = max(1, min(n, MAX_QUESTION_BATCH))
+    asked_text = asked_lines(asked) if asked else "None yet."
+    msg = (
+        session_prefix(topic, proficiency) +
+        f"Generate exactly {n} interview questions, in the order they will be asked.\n"
+        f"Previously asked questions:\n{asked_text}"
     )
-    r = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{"role": "system", "content": _QUESTION_PROMPT},
-                  {"role": "user",   "content": msg}],
-        temperature=0.85, max_completion_tokens=500, top_p=1, stream=False,
+    data = complete_json(
+        client, "question",
+        required=("questions",),
+        messages=[_BATCH_MSG, {"role": "user", "content": msg}],
+        temperature=0.85, max_completion_tokens=500 * n, top_p=1,
+        reasoning_effort="low",
     )
-    raw = (r.choices[0].message.content or "").strip()
-    if raw.startswith("```"):
-        raw = raw.split("```")[1].lstrip("json").strip()
-    return repair_json(raw)
+    questions = data["questions"]
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("Groq returned no questions for the interview batch.")
+    return [q for q in questions if isinstance(q, dict) and q.get("question")][:n]
 
 
-def _eval_answer(client, question: str, expected_concepts: list[str],
+def _eval_answer(client, question: str, expected_concepts: Sequence[str],
                  user_answer: str, proficiency: str) -> dict:
+    if is_trivial_answer(user_answer):
+        return {
+            "is_correct": False, "score": 0, "grade": "Incorrect",
+            "concepts_covered": [], "concepts_missing": list(expected_concepts),
+            "feedback": "No answer was given, so none of the expected concepts were covered.",
+            "complete_answer": "",
+            "encouragement": "Have a go next time — even a partial answer earns credit.",
+        }
     concepts_str = ", ".join(expected_concepts) if expected_concepts else "general understanding"
+    # Proficiency leads (shared by every grading call of the session), the
+    # candidate's answer trails.
     msg = (
+        f"Proficiency level: {proficiency}\n"
         f"Question asked: {question}\n"
-        f"Expected key concepts: {concepts_str}\n"
-        f"Proficiency level: {proficiency}\n\n"
+        f"Expected key concepts: {concepts_str}\n\n"
         f"Candidate's spoken answer:\n\"{user_answer}\"\n\n"
         "Perform semantic evaluation of this spoken answer."
     )
-    r = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{"role": "system", "content": _EVAL_PROMPT},
-                  {"role": "user",   "content": msg}],
-        temperature=0.2, max_completion_tokens=800,
-        reasoning_effort="medium", top_p=1, stream=False,
+    return complete_json(
+        client, "eval_short",
+        required=("score", "grade", "feedback"),
+        messages=[_EVAL_MSG, {"role": "user", "content": msg}],
+        # Scoring one answer against listed concepts: low effort suffices.
+        temperature=0.2, max_completion_tokens=700,
+        reasoning_effort="low", top_p=1,
+    )
+
+
+def _gen_analysis(client, topic: str, proficiency: str, history: list[dict],
+                  on_token: TokenCallback | None = None) -> dict:
+    # Transcript in answer order after a fixed header, so the prompt for a
+    # longer history extends the previous one instead of diverging early.
+    qa_block = "".join(
+        f"Q{i}: {item.get('question', '')}\n"
+        f"Answer: {item.get('user_answer', '(no answer)')}\n"
+        f"Score: {item.get('score', 0)}/10 | Grade: {item.get('grade', 'N/A')}\n"
+        f"Missing concepts: {', '.join(item.get('concepts_missing', [])) or '—'}\n\n"
+        for i, item in enumerate(history, 1)
     )
-    raw = (r.choices[0].message.content or "").strip()
-    if raw.startswith("```"):
-        raw = raw.split("```")[1].lstrip("json").strip()
-    return repair_json(raw)
-
-
-def _gen_analysis(client, topic: str, proficiency: str, history: list[dict]) -> dict:
-    qa_block = ""
-    for i, item in enumerate(history, 1):
-        missing = ", ".join(item.get("concepts_missing", [])) or "—"
-        qa_block += (
-            f"Q{i}: {item.get('question', '')}\n"
-            f"Answer: {item.get('user_answer', '(no answer)')}\n"
-            f"Score: {item.get('score', 0)}/10 | Grade: {item.get('grade', 'N/A')}\n"
-            f"Missing concepts: {missing}\n\n"
-        )
     msg = (
-        f"Topic: {topic}\n"
-        f"Proficiency: {proficiency}\n"
-        f"Total questions answered: {len(history)}\n\n"
+        session_prefix(topic, proficiency) +
+        "Generate the comprehensive final performance analysis.\n\n"
         f"Full interview transcript:\n{qa_block}"
-        "Generate the comprehensive final performance analysis."
+        f"Total questions answered: {len(history)}"
     )
-    r = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{"role": "system", "content": _ANALYSIS_PROMPT},
-                  {"role": "user",   "content": msg}],
-        temperature=0.2, max_completion_tokens=1000, top_p=1, stream=False,
+    raw = complete_text(
+        client, on_token,
+        model=MODELS["analysis"],
+        json_mode=True,
+        messages=[_ANALYSIS_MSG, {"role": "user", "content": msg}],
+        # Whole-session synthesis is where deliberate reasoning pays off.
+        temperature=0.2, max_completion_tokens=1000, top_p=1,
+        reasoning_effort="medium",
     )
-    raw = (r.choices[0].message.content or "").strip()
-    if raw.startswith("```"):
-        raw = raw.split("```")[1].lstrip("json").strip()
-    return repair_json(raw)
+    return parse_llm_json(raw)
 
 
 # ── Tool factory functions ──────────────────────────────────────────────────────
 
 def create_interview_question_tool(groq_client) -> Tool:
     def func(topic: str, proficiency: str = "intermediate", question_num: int = 1,
-             total: int = 5, asked_questions: list = None) -> dict:
+             total: int = 5, asked_questions: list = None,
+             on_token: TokenCallback | None = None) -> dict:
         return _gen_question(groq_client, topic, proficiency,
-                             question_num, total, asked_questions or [])
+                             question_num, total, asked_questions or (), on_token)
     return Tool(
         name="generate_interview_question",
         description=(
@@ -181,25 +255,56 @@ def create_interview_question_tool(groq_client) -> Tool:
                 "question_num":    {"type": "integer", "description": "Current question number (1-indexed)"},
                 "total":           {"type": "integer", "description": "Total questions in session"},
                 "asked_questions": {"type": "array",  "items": {"type": "string"},
-                                    "description": "List of previously asked questions to avoid repetition"},
+                                    "description": "List of previously asked questions to avoid repetition "
+                                                   f"(the {ASKED_PROMPT_LIMIT} most recent distinct ones are used)"},
             },
             "required": ["topic"],
         },
         func=func,
+        parallel_safe=True,
+    )
+
+
+def create_interview_question_batch_tool(groq_client) -> Tool:
+    def func(topic: str, n: int, proficiency: str = "intermediate",
+             asked_questions: list = None) -> list[dict]:
+        return _gen_question_batch(groq_client, topic, proficiency, n, asked_questions or ())
+    return Tool(
+        name="generate_interview_question_batch",
+        description=(
+            "Generate the next n questions of an interview session in one call "
+            "(same question shape as generate_interview_question), in asking order."
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "topic":           {"type": "string", "description": "Subject being assessed"},
+                "n":               {"type": "integer", "minimum": 1, "maximum": MAX_QUESTION_BATCH,
+                                    "description": f"Questions to generate (1-{MAX_QUESTION_BATCH})"},
+                "proficiency":     {"type": "string", "enum": ["beginner", "intermediate", "advanced"]},
+                "asked_questions": {"type": "array",  "items": {"type": "string"},
+                                    "description": "Questions already asked in this session "
+                                                   f"(the {ASKED_PROMPT_LIMIT} most recent distinct ones are used)"},
+            },
+            "required": ["topic", "n"],
+        },
+        func=func,
+        parallel_safe=True,
     )
 
 
 def create_interview_eval_tool(groq_client) -> Tool:
     def func(question: str, user_answer: str,
              expected_concepts: list = None, proficiency: str = "intermediate") -> dict:
-        return _eval_answer(groq_client, question, expected_concepts or [],
+        return _eval_answer(groq_client, question, expected_concepts or (),
                             user_answer, proficiency)
     return Tool(
         name="evaluate_interview_answer",
         description=(
             "Semantically evaluate a candidate's spoken (or typed) interview answer. "
             "Checks concept coverage, accuracy, and depth. Returns score, grade, "
-            "feedback, missing concepts, and the complete ideal answer."
+            "feedback, missing concepts, and the complete ideal answer. "
+            "Blank or non-answers ('idk', 'skip') score 0 without an LLM call."
         ),
         parameters={
             "type": "object",
@@ -213,12 +318,16 @@ def create_interview_eval_tool(groq_client) -> Tool:
             "required": ["question", "user_answer"],
         },
         func=func,
+        cacheable=True,
+        cache_key=normalized_cache_key,
+        parallel_safe=True,
     )
 
 
 def create_interview_analysis_tool(groq_client) -> Tool:
-    def func(topic: str, interview_history: list, proficiency: str = "intermediate") -> dict:
-        return _gen_analysis(groq_client, topic, proficiency, interview_history)
+    def func(topic: str, interview_history: list, proficiency: str = "intermediate",
+             on_token: TokenCallback | None = None) -> dict:
+        return _gen_analysis(groq_client, topic, proficiency, interview_history, on_token)
     return Tool(
         name="generate_interview_analysis",
         description=(
@@ -238,4 +347,6 @@ def create_interview_analysis_tool(groq_client) -> Tool:
             "required": ["topic", "interview_history"],
         },
         func=func,
+        cacheable=True,
+        parallel_safe=True,
     )
@@ -9,7 +9,9 @@ against the sample answer and a set of rubric criteria.
 Exports: create_level2_eval_tool(groq_client) → Tool
 """
 
-from tools import Tool, repair_json
+from tools import (
+    Tool, complete_json, is_trivial_answer, normalized_cache_key,
+)
 
 _SYSTEM_PROMPT = """\
 You are an expert educational evaluator assessing conceptual understanding.
@@ -29,6 +31,8 @@ Format:
 Grade thresholds: Excellent ≥ 8, Good ≥ 6, Fair ≥ 4, Needs Work < 4.
 """
 
+_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_PROMPT}   # built once
+
 L2_EVAL_PARAMETERS: dict = {
     "type": "object",
     "properties": {
@@ -47,7 +51,7 @@ L2_EVAL_PARAMETERS: dict = {
 
 def _evaluate(groq_client, question: str, user_answer: str,
               sample_answer: str, proficiency: str) -> dict:
-    if not user_answer.strip():
+    if is_trivial_answer(user_answer):
         return {
             "score": 0, "max_score": 10, "grade": "Needs Work",
             "feedback": "No answer was provided.",
@@ -63,27 +67,19 @@ def _evaluate(groq_client, question: str, user_answer: str,
         "Evaluate the student's answer. Return ONLY the JSON evaluation."
     )
 
-    completion = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user",   "content": user_msg},
-        ],
+    return complete_json(
+        groq_client, "eval_short",
+        required=("score", "feedback"),
+        empty_error="Groq returned empty evaluation response.",
+        messages=[_SYSTEM_MSG, {"role": "user", "content": user_msg}],
         temperature=0.7,
-        max_completion_tokens=800,
+        # One answer against a reference answer: low effort, and a ceiling
+        # sized for that reasoning plus the ~300-token evaluation.
+        max_completion_tokens=600,
         top_p=1,
-        reasoning_effort="medium",
-        stream=False,
-        stop=None,
+        reasoning_effort="low",
     )
 
-    text = (completion.choices[0].message.content or "").strip()
-    if text.startswith("```"):
-        text = text.split("```")[1].lstrip("json").strip()
-    if not text:
-        raise ValueError("Groq returned empty evaluation response.")
-    return repair_json(text)
-
 
 def create_level2_eval_tool(groq_client) -> Tool:
     """Factory: build the L2 evaluator tool with the Groq client injected."""
@@ -95,8 +91,12 @@ def create_level2_eval_tool(groq_client) -> Tool:
         name="evaluate_why_answer",
         description=(
             "Evaluate a student's open text answer to a Level 2 'Why / Explain / Scenario' question. "
-            "Returns {score, max_score, grade, feedback, key_points_hit, missing_points, model_answer}."
+            "Returns {score, max_score, grade, feedback, key_points_hit, missing_points, model_answer}. "
+            "Blank or non-answers ('idk', 'skip') score 0 without an LLM call."
         ),
         parameters=L2_EVAL_PARAMETERS,
         func=func,
+        cacheable=True,
+        cache_key=normalized_cache_key,
+        parallel_safe=True,
     )
@@ -8,14 +8,18 @@ calibrated to the student's proficiency band.
 Exports: create_level2_question_tool(groq_client) → Tool
 """
 
-from tools import Tool, repair_json
+from typing import Sequence
 
-_SYSTEM_PROMPT = """\
+from tools import (
+    ASKED_PROMPT_LIMIT, JSON_ONLY_HEADER, Tool, asked_lines, calibration_block, calibration_key,
+    complete_json, session_prefix,
+)
+
+_SYSTEM_PROMPT = JSON_ONLY_HEADER + """\
 You are an expert assessment designer specialising in conceptual-understanding questions.
 Generate ONE open-ended question that requires the student to EXPLAIN or REASON — not just recall a fact.
 Question types you may use: "Why…", "Explain why…", "In the following scenario, why does…",
 "What would happen if… and why".
-Always respond with ONLY valid JSON, no markdown, no extra text.
 Format:
 {
   "question": "...",
@@ -41,6 +45,14 @@ _PROFICIENCY_CONTEXT = {
     "advanced":     "Use complex, nuanced scenarios; expect deep mechanistic explanation.",
 }
 
+# Every calibration rides in the static system message (built once); the
+# user message only names the tier and proficiency to apply.
+_SYSTEM_MSG = {"role": "system", "content": (
+    _SYSTEM_PROMPT
+    + calibration_block("Difficulty calibration", _DIFFICULTY_CONTEXT)
+    + calibration_block("Proficiency calibration", _PROFICIENCY_CONTEXT)
+)}
+
 # ── JSON Schema ───────────────────────────────────────────────────────────────
 L2_QUESTION_PARAMETERS: dict = {
     "type": "object",
@@ -59,7 +71,8 @@ L2_QUESTION_PARAMETERS: dict = {
         "asked_questions": {
             "type": "array",
             "items": {"type": "string"},
-            "description": "Questions already asked this session (avoid repeats).",
+            "description": ("Questions already asked this session (avoid repeats); only the "
+                            f"{ASKED_PROMPT_LIMIT} most recent distinct entries reach the prompt."),
         },
     },
     "required": ["topic"],
@@ -67,48 +80,40 @@ L2_QUESTION_PARAMETERS: dict = {
 
 
 def _generate(groq_client, topic: str, difficulty: str,
-              proficiency: str, asked_questions: list[str]) -> dict:
+              proficiency: str, asked_questions: Sequence[str]) -> dict:
     avoid = ""
     if asked_questions:
-        avoid = "\nDo NOT repeat these questions:\n" + "\n".join(f"- {q}" for q in asked_questions)
+        avoid = "\nDo NOT repeat these questions:\n" + asked_lines(asked_questions)
 
-    diff_ctx = _DIFFICULTY_CONTEXT.get(difficulty, _DIFFICULTY_CONTEXT["medium"])
-    prof_ctx = _PROFICIENCY_CONTEXT.get(proficiency.lower(), _PROFICIENCY_CONTEXT["intermediate"])
+    difficulty  = calibration_key(difficulty, _DIFFICULTY_CONTEXT, "medium")
+    proficiency = calibration_key(proficiency, _PROFICIENCY_CONTEXT, "intermediate")
 
+    # Stable parts lead and the growing avoid-list trails, so a session's
+    # prompts share a long prefix (provider-side prefix caching).
     user_msg = (
-        f"Proficiency: {proficiency}. {prof_ctx}\n"
-        f"Difficulty within this level: {difficulty}. {diff_ctx}\n\n"
-        f"Topic: {topic}{avoid}\n"
-        "Generate a WHY / EXPLAIN / SCENARIO question. Return ONLY the JSON."
+        session_prefix(topic, proficiency) +
+        "Generate a WHY / EXPLAIN / SCENARIO question. Return ONLY the JSON.\n"
+        f"Difficulty within this level: {difficulty}{avoid}"
     )
 
-    completion = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user",   "content": user_msg},
-        ],
+    return complete_json(
+        groq_client, "question",
+        required=("question", "sample_answer"),
+        empty_error="Groq returned an empty response for L2 question.",
+        messages=[_SYSTEM_MSG, {"role": "user", "content": user_msg}],
         temperature=1,
-        max_completion_tokens=1000,
+        # Rote generation like the MCQ tool: low effort and a matching ceiling.
+        max_completion_tokens=800,
         top_p=1,
-        reasoning_effort="medium",
-        stream=False,
-        stop=None,
+        reasoning_effort="low",
     )
 
-    text = (completion.choices[0].message.content or "").strip()
-    if text.startswith("```"):
-        text = text.split("```")[1].lstrip("json").strip()
-    if not text:
-        raise ValueError("Groq returned an empty response for L2 question.")
-    return repair_json(text)
-
 
 def create_level2_question_tool(groq_client) -> Tool:
     """Factory: L2 question tool with Groq client injected."""
     def func(topic: str, difficulty: str = "medium", proficiency: str = "intermediate",
              asked_questions: list[str] | None = None) -> dict:
-        return _generate(groq_client, topic, difficulty, proficiency, asked_questions or [])
+        return _generate(groq_client, topic, difficulty, proficiency, asked_questions or ())
 
     return Tool(
         name="generate_why_question",
@@ -119,4 +124,5 @@ def create_level2_question_tool(groq_client) -> Tool:
         ),
         parameters=L2_QUESTION_PARAMETERS,
         func=func,
+        parallel_safe=True,
     )
@@ -15,59 +15,70 @@ Mastery is defined as:
 Exports: create_level3_eval_tool(groq_client) → Tool
 """
 
-from tools import Tool, repair_json
+from concurrent.futures import ThreadPoolExecutor
 
-_SYSTEM_PROMPT = """\
+from throttle import LLM_GATE
+from tools import (
+    MODELS, Tool, complete_text, is_trivial_answer, normalized_cache_key, parse_llm_json,
+)
+
+# Each decision is graded by its own short call and the cross-decision
+# judgement by one more; all run concurrently and _evaluate assembles the
+# combined report, so latency is one small generation instead of one large one.
+_STEP_PROMPT = """\
 You are a senior mastery assessor for branching decision scenarios.
-Evaluate the student's sequential decisions BOTH individually AND for their
-strategic coherence across the full scenario.
+Grade ONE decision a student made at one step of a scenario.
 
-Key assessment dimensions:
-1. Individual decision quality (accuracy, specificity, appropriateness)
-2. Consequence awareness (did they account for what happened in prior steps?)
-3. Consistency (do decisions form a coherent, expert-level strategy?)
-4. Strategic depth (trade-offs, stakeholder thinking, long-term impact)
+Assess: accuracy, specificity and appropriateness of the decision, and whether
+it accounts for the situation as it stands at this step.
+
+Always respond with ONLY valid JSON, no markdown, no extra text.
+Format:
+{
+  "score": <0-10>,
+  "feedback": "2 sentences: what they got right + what they missed in this specific decision"
+}
+"""
+
+_CONSISTENCY_PROMPT = """\
+You are a senior mastery assessor for branching decision scenarios.
+Judge the student's sequence of decisions AS A WHOLE — not each step's quality.
+
+Assess: do later decisions acknowledge the consequences of earlier ones, and do
+the decisions form a coherent, expert-level strategy (trade-offs, stakeholder
+thinking, long-term impact)?
 
 Always respond with ONLY valid JSON, no markdown, no extra text.
 Format:
 {
-  "decision_scores": [
-    {
-      "step": 1,
-      "score": <0-10>,
-      "max_score": 10,
-      "grade": "Excellent|Good|Fair|Needs Work",
-      "feedback": "2 sentences: what they got right + what they missed in this specific decision"
-    },
-    {
-      "step": 2,
-      "score": <0-10>,
-      "max_score": 10,
-      "grade": "Excellent|Good|Fair|Needs Work",
-      "feedback": "..."
-    },
-    {
-      "step": 3,
-      "score": <0-10>,
-      "max_score": 10,
-      "grade": "Excellent|Good|Fair|Needs Work",
-      "feedback": "..."
-    }
-  ],
   "consistency_score": <0-10>,
   "consistency_note": "1-2 sentences: did their decisions form a coherent strategy? Were later decisions consistent with earlier ones?",
-  "total_score": <sum of all decision scores>,
-  "total_max_score": 30,
-  "overall_grade": "Excellent|Good|Fair|Needs Work",
   "expert_assessment": "2 sentences: does this student demonstrate Expert-level mastery? What separates their thinking from a true expert?",
-  "model_approach": "How a domain expert would approach this ENTIRE scenario in 4-5 sentences — covering all 3 decisions as a coherent strategy."
+  "model_approach": "How a domain expert would approach this ENTIRE scenario in 4-5 sentences — covering all decisions as a coherent strategy."
 }
 
-Grade thresholds: Excellent ≥ 8, Good ≥ 6, Fair ≥ 4, Needs Work < 4.
 Consistency: 10 = perfectly coherent expert strategy, 5 = mostly consistent, 1 = contradictory decisions.
-Overall grade: based on (total_score/30 * 100): Excellent ≥ 80%, Good ≥ 60%, Fair ≥ 40%, Needs Work < 40%.
 """
 
+_STEP_MSG        = {"role": "system", "content": _STEP_PROMPT}
+_CONSISTENCY_MSG = {"role": "system", "content": _CONSISTENCY_PROMPT}
+
+# Grade thresholds on a 0-10 score (overall grade uses the percentage / 10).
+_GRADES = ((8, "Excellent"), (6, "Good"), (4, "Fair"))
+
+# Per-decision and consistency calls for concurrent evaluations share this
+# pool.  Each of those requests takes its own LLM_GATE slot (the tool is
+# gates_itself), so the gate's concurrency and rate limits count them all.
+_EVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="l3-eval")
+
+
+def _grade(score: float) -> str:
+    for floor, label in _GRADES:
+        if score >= floor:
+            return label
+    return "Needs Work"
+
+
 L3_EVAL_PARAMETERS: dict = {
     "type": "object",
     "properties": {
@@ -95,27 +106,66 @@ L3_EVAL_PARAMETERS: dict = {
 }
 
 
-def _evaluate(groq_client, scenario: str, decision_points: list[dict],
-              user_answers: dict, sample_answers: dict, proficiency: str) -> dict:
-    """Build a structured prompt and call Groq for full scenario evaluation."""
-
-    # ── Build decision summary block ───────────────────────────────────────────
-    blocks: list[str] = []
-    for dp in decision_points:
-        step   = str(dp.get("step", "?"))
-        sit    = dp.get("situation", "")
-        answer = user_answers.get(step, "(no answer provided)")
-        expert = sample_answers.get(step, "")
-
-        block = f"DECISION {step}:\nSituation: {sit}\nStudent Answer: {answer}"
-        if expert:
-            block += f"\nExpert Reference: {expert}"
-        blocks.append(block)
+def _complete_json(groq_client, system_msg: dict, user_msg: str,
+                   max_tokens: int, effort: str) -> dict:
+    with LLM_GATE.slot():
+        text = complete_text(
+            groq_client,
+            model=MODELS["l3"],
+            json_mode=True,
+            messages=[system_msg, {"role": "user", "content": user_msg}],
+            temperature=0.7,
+            max_completion_tokens=max_tokens,
+            top_p=1,
+            reasoning_effort=effort,
+        )
+    return parse_llm_json(text, "Groq returned empty L3 evaluation response.")
+
+
+def _score_one(groq_client, scenario: str, step: str, situation: str,
+               answer: str, expert: str, proficiency: str) -> dict:
+    """Grade a single decision → {step, score, max_score, grade, feedback}."""
+    if is_trivial_answer(answer):
+        return {"step": step, "score": 0, "max_score": 10,
+                "grade": "Needs Work", "feedback": "No answer provided."}
+    user_msg = (
+        f"Proficiency level: {proficiency}\n\n"
+        f"SCENARIO:\n{scenario}\n\n"
+        f"DECISION {step}:\nSituation: {situation}\nStudent Answer: {answer}"
+    )
+    if expert:
+        user_msg += f"\nExpert Reference: {expert}"
+    result = _complete_json(groq_client, _STEP_MSG, user_msg + "\n\nReturn ONLY the JSON.",
+                            400, "low")
+    try:
+        score = max(0.0, min(10.0, float(result.get("score") or 0)))
+    except (TypeError, ValueError):
+        score = 0.0
+    return {"step": step, "score": score, "max_score": 10,
+            "grade": _grade(score), "feedback": result.get("feedback", "")}
+
+
+def _score_consistency(groq_client, scenario: str, decisions_block: str,
+                       proficiency: str) -> dict:
+    """Judge the decisions as one strategy → consistency and expert fields."""
+    user_msg = (
+        f"Proficiency level: {proficiency}\n\n"
+        f"SCENARIO:\n{scenario}\n\n"
+        f"{decisions_block}\n\n"
+        "Judge the decisions above as one strategy. Return ONLY the JSON."
+    )
+    # Judging coherence across decisions is the one step that needs reasoning.
+    return _complete_json(groq_client, _CONSISTENCY_MSG, user_msg, 1000, "medium")
 
-    decisions_block = "\n\n".join(blocks)
 
+def _evaluate(groq_client, scenario: str, decision_points: list[dict],
+              user_answers: dict, sample_answers: dict, proficiency: str) -> dict:
+    """
+    Grade every decision and the cross-decision consistency with concurrent
+    Groq calls, then assemble the full scenario evaluation.
+    """
     # Check for empty answers
-    if all(not v.strip() for v in user_answers.values()):
+    if all(is_trivial_answer(v) for v in user_answers.values()):
         return {
             "decision_scores": [
                 {"step": i+1, "score": 0, "max_score": 10, "grade": "Needs Work", "feedback": "No answer provided."}
@@ -124,42 +174,49 @@ def _evaluate(groq_client, scenario: str, decision_points: list[dict],
             "consistency_score": 0,
             "consistency_note": "No answers provided.",
             "total_score": 0,
-            "total_max_score": 30,
+            "total_max_score": 10 * len(decision_points),
             "overall_grade": "Needs Work",
             "expert_assessment": "No attempt was made.",
             "model_approach": sample_answers.get("1", "") + " " + sample_answers.get("2", "") + " " + sample_answers.get("3", ""),
         }
 
-    user_msg = (
-        f"Proficiency level: {proficiency}\n\n"
-        f"SCENARIO:\n{scenario}\n\n"
-        f"{decisions_block}\n\n"
-        "Evaluate all decisions above. Pay special attention to:\n"
-        "- Whether step 2 and 3 answers acknowledge the consequences of earlier decisions.\n"
-        "- Whether the overall strategy is coherent and expert-level.\n"
-        "Return ONLY the JSON evaluation."
+    steps = [
+        (str(dp.get("step", "?")), dp.get("situation", "")) for dp in decision_points
+    ]
+    # Report numeric steps as ints, as the single-call format did.
+    labels = {step: int(step) if step.isdigit() else step for step, _ in steps}
+    decisions_block = "\n\n".join(
+        f"DECISION {step}:\nSituation: {sit}\n"
+        f"Student Answer: {user_answers.get(step, '(no answer provided)')}"
+        for step, sit in steps
     )
-
-    completion = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user",   "content": user_msg},
-        ],
-        temperature=0.7,
-        max_completion_tokens=1200,
-        top_p=1,
-        reasoning_effort="medium",
-        stream=False,
-        stop=None,
+    consistency = _EVAL_POOL.submit(
+        _score_consistency, groq_client, scenario, decisions_block, proficiency,
     )
-
-    text = (completion.choices[0].message.content or "").strip()
-    if text.startswith("```"):
-        text = text.split("```")[1].lstrip("json").strip()
-    if not text:
-        raise ValueError("Groq returned empty L3 evaluation response.")
-    return repair_json(text)
+    per_step = [
+        _EVAL_POOL.submit(
+            _score_one, groq_client, scenario, step, sit,
+            user_answers.get(step, ""), sample_answers.get(step, ""), proficiency,
+        )
+        for step, sit in steps
+    ]
+    decision_scores = [f.result() for f in per_step]
+    overall = consistency.result()
+
+    for d in decision_scores:
+        d["step"] = labels[d["step"]]
+    total     = sum(d["score"] for d in decision_scores)
+    total_max = 10 * len(decision_scores)
+    return {
+        "decision_scores":   decision_scores,
+        "consistency_score": overall.get("consistency_score", 0),
+        "consistency_note":  overall.get("consistency_note", ""),
+        "total_score":       total,
+        "total_max_score":   total_max,
+        "overall_grade":     _grade(10 * total / total_max if total_max else 0),
+        "expert_assessment": overall.get("expert_assessment", ""),
+        "model_approach":    overall.get("model_approach", ""),
+    }
 
 
 def create_level3_eval_tool(groq_client) -> Tool:
@@ -175,8 +232,13 @@ def create_level3_eval_tool(groq_client) -> Tool:
             "Evaluate a student's sequential decisions in a Level 3 Branching Decision Tree scenario. "
             "Scores each decision point individually AND measures consistency/coherence across all decisions. "
             "Returns {decision_scores[], consistency_score, consistency_note, total_score, "
-            "total_max_score, overall_grade, expert_assessment, model_approach}."
+            "total_max_score, overall_grade, expert_assessment, model_approach}. "
+            "Blank or non-answer decisions ('idk', 'skip') score 0 without an LLM call."
         ),
         parameters=L3_EVAL_PARAMETERS,
         func=func,
+        cacheable=True,
+        cache_key=normalized_cache_key,
+        parallel_safe=True,
+        gates_itself=True,
     )
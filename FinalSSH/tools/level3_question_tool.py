@@ -18,14 +18,22 @@ Design principles
 Exports: create_level3_question_tool(groq_client) → Tool
 """
 
-from tools import Tool, repair_json
+import logging
+from typing import Sequence
 
-_SYSTEM_PROMPT = """\
+from tools import (
+    JSON_ONLY_HEADER, MODELS, Tool, TokenCallback, asked_lines, calibration_block,
+    calibration_key, compile_validator, complete_validated, find_repeat,
+    session_prefix,
+)
+
+logger = logging.getLogger(__name__)
+
+_SYSTEM_PROMPT = JSON_ONLY_HEADER + """\
 You are a senior mastery-assessment designer specialising in high-stakes real-world scenarios.
 Create a BRANCHING DECISION TREE: a dynamic crisis or strategic challenge where the student
 makes 3 sequential, consequential decisions. Each step MUST build on the previous outcome.
 
-Always respond with ONLY valid JSON, no markdown, no extra text.
 Format (follow this exactly):
 {
   "scenario": "You are [specific role] at [specific organisation/place]. [Crisis in 2-3 sentences with real numbers, names, stakes. Make it vivid and urgent.]",
@@ -91,6 +99,55 @@ _PROFICIENCY_CONTEXT = {
     "advanced":     "Use expert-level scenarios with deep domain complexity (board-level decisions, architectural crises, regulatory pressure).",
 }
 
+# Every calibration rides in the static system message (built once); the
+# user message only names the tier and proficiency to apply.
+_SYSTEM_MSG = {"role": "system", "content": (
+    _SYSTEM_PROMPT
+    + calibration_block("Difficulty tiers", _DIFFICULTY_CONTEXT)
+    + calibration_block("Proficiency calibration", _PROFICIENCY_CONTEXT)
+)}
+
+# Scenario openings are long and only their theme matters, so the avoid-list
+# keeps a short window of short titles: the block stays small and bounded.
+_ASKED_LIMIT = 10
+_ASKED_CLIP  = 60
+
+# A scenario that near-duplicates one already used this session (checked
+# locally, see tools.find_repeat) is regenerated at most this many times,
+# hotter and with the repeated theme named.
+_REPEAT_RETRIES     = 2
+_REPEAT_TEMPERATURE = 1.3
+
+# ── Reasoning budget ───────────────────────────────────────────────────────────
+# (reasoning_effort, max_completion_tokens) by (difficulty, proficiency).  Easy
+# or beginner-pitched scenarios need little deliberation; only hard scenarios
+# for advanced students get high effort.  Ceilings leave room for the ~1k-token
+# scenario after reasoning.
+_EFFORT_DEFAULT = ("medium", 2500)
+_EFFORT: dict[tuple[str, str], tuple[str, int]] = {
+    ("easy",   "beginner"):     ("low",  1800),
+    ("easy",   "intermediate"): ("low",  1800),
+    ("easy",   "advanced"):     ("low",  1800),
+    ("medium", "beginner"):     ("low",  1800),
+    ("hard",   "advanced"):     ("high", 4000),
+}
+
+# Shape every served scenario must have; checked once per reply.
+SCENARIO_SCHEMA: dict = {
+    "type": "object",
+    "required": ["scenario", "decision_points"],
+    "properties": {
+        "scenario": {"type": "string"},
+        "decision_points": {
+            "type": "array",
+            "minItems": 1,
+            "items": {"type": "object", "required": ["step", "situation"]},
+        },
+        "sample_answers": {"type": "object"},
+    },
+}
+_validate_scenario = compile_validator(SCENARIO_SCHEMA, "scenario")
+
 # ── JSON Schema ────────────────────────────────────────────────────────────────
 L3_QUESTION_PARAMETERS: dict = {
     "type": "object",
@@ -109,7 +166,9 @@ L3_QUESTION_PARAMETERS: dict = {
         "asked_questions": {
             "type": "array",
             "items": {"type": "string"},
-            "description": "Scenario openings already used this session (avoid repeating themes).",
+            "description": ("Scenario openings already used this session (avoid repeating themes); only the "
+                            f"{_ASKED_LIMIT} most recent distinct entries reach the prompt, clipped to "
+                            f"{_ASKED_CLIP} characters — sending just each scenario's opening is enough."),
         },
     },
     "required": ["topic"],
@@ -117,56 +176,64 @@ L3_QUESTION_PARAMETERS: dict = {
 
 
 def _generate(groq_client, topic: str, difficulty: str,
-              proficiency: str, asked_questions: list[str]) -> dict:
+              proficiency: str, asked_questions: Sequence[str],
+              on_token: TokenCallback | None = None) -> dict:
     avoid = ""
     if asked_questions:
-        avoid = "\nDo NOT reuse themes from:\n" + "\n".join(f"- {q[:80]}…" for q in asked_questions)
+        avoid = "\nDo NOT reuse themes from:\n" + asked_lines(
+            asked_questions, clip=_ASKED_CLIP, limit=_ASKED_LIMIT)
 
-    diff_ctx = _DIFFICULTY_CONTEXT.get(difficulty, _DIFFICULTY_CONTEXT["medium"])
-    prof_ctx = _PROFICIENCY_CONTEXT.get(proficiency.lower(), _PROFICIENCY_CONTEXT["intermediate"])
+    difficulty  = calibration_key(difficulty, _DIFFICULTY_CONTEXT, "medium")
+    proficiency = calibration_key(proficiency, _PROFICIENCY_CONTEXT, "intermediate")
 
+    # Stable parts lead and the growing avoid-list trails, so a session's
+    # prompts share a long prefix (provider-side prefix caching).
     user_msg = (
-        f"Proficiency: {proficiency}. {prof_ctx}\n"
-        f"Difficulty tier: {difficulty}. {diff_ctx}\n\n"
-        f"Domain / topic: {topic}{avoid}\n\n"
-        "Generate the branching decision-tree scenario. Return ONLY the JSON."
-    )
-
-    completion = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user",   "content": user_msg},
-        ],
-        temperature=1,
-        max_completion_tokens=2500,
-        top_p=1,
-        reasoning_effort="medium",
-        stream=False,
-        stop=None,
+        session_prefix(topic, proficiency) +
+        "Generate the branching decision-tree scenario. Return ONLY the JSON.\n"
+        f"Difficulty tier: {difficulty}{avoid}"
     )
 
-    text = (completion.choices[0].message.content or "").strip()
-    if text.startswith("```"):
-        text = text.split("```")[1].lstrip("json").strip()
-    if not text:
-        raise ValueError("Groq returned empty response for L3 scenario.")
-    result = repair_json(text)
-    # Validate required structure
-    if not result.get("scenario"):
-        raise ValueError("L3 response missing 'scenario' field")
-    if not result.get("decision_points"):
-        raise ValueError("L3 response missing 'decision_points' array")
-    if not isinstance(result["decision_points"], list) or len(result["decision_points"]) == 0:
-        raise ValueError("L3 decision_points must be a non-empty array")
+    effort, ceiling = _EFFORT.get((difficulty, proficiency), _EFFORT_DEFAULT)
+    # Hard scenarios always get the large model; easy beginner ones do not need it.
+    tier = "l3_easy" if (difficulty, proficiency) == ("easy", "beginner") else "l3"
+
+    def generate(msg: str, temperature: float,
+                 on_token: TokenCallback | None) -> dict:
+        # A scenario that fails validation (usually cut off at the ceiling)
+        # is requested once more with half as much room again.
+        return complete_validated(
+            groq_client, _validate_scenario, (ceiling, ceiling * 3 // 2), on_token,
+            empty_error="Groq returned empty response for L3 scenario.",
+            model=MODELS[tier],
+            messages=[_SYSTEM_MSG, {"role": "user", "content": msg}],
+            temperature=temperature,
+            top_p=1,
+            reasoning_effort=effort,
+            stop=None,
+        )
+
+    result = generate(user_msg, 1, on_token)
+    for _ in range(_REPEAT_RETRIES):
+        repeated = find_repeat(result["scenario"], asked_questions)
+        if repeated is None:
+            break
+        logger.info("L3 scenario repeats an earlier theme; regenerating.")
+        result = generate(
+            f"{user_msg}\nA draft repeated this already-used theme: "
+            f"{repeated[:_ASKED_CLIP]}… Choose a different setting and crisis.",
+            _REPEAT_TEMPERATURE, None,
+        )
     return result
 
 
 def create_level3_question_tool(groq_client) -> Tool:
     """Factory: L3 branching decision tree scenario tool."""
     def func(topic: str, difficulty: str = "medium", proficiency: str = "intermediate",
-             asked_questions: list[str] | None = None) -> dict:
-        return _generate(groq_client, topic, difficulty, proficiency, asked_questions or [])
+             asked_questions: list[str] | None = None,
+             on_token: TokenCallback | None = None) -> dict:
+        return _generate(groq_client, topic, difficulty, proficiency,
+                         asked_questions or (), on_token)
 
     return Tool(
         name="generate_scenario",
@@ -178,4 +245,5 @@ def create_level3_question_tool(groq_client) -> Tool:
         ),
         parameters=L3_QUESTION_PARAMETERS,
         func=func,
+        parallel_safe=True,
     )
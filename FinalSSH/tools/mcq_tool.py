@@ -2,15 +2,19 @@
 tools/mcq_tool.py
 ─────────────────
 Generates adaptive multiple-choice questions using Groq (openai/gpt-oss-120b).
-Exports create_mcq_tool(groq_client) → Tool.
+Exports create_mcq_tool(groq_client) → Tool
+    and create_mcq_batch_tool(groq_client) → Tool (N questions per LLM call).
 """
 
-import json
-from tools import Tool
+from tools import (
+    ASKED_PROMPT_LIMIT, JSON_ONLY_HEADER, MODELS, Tool, TokenCallback, asked_lines,
+    calibration_block, calibration_key, compile_validator, complete_text,
+    complete_validated, parse_llm_json, session_prefix,
+)
 
 # ── System prompt sent to the question-generation model ───────────────────────
-_SYSTEM_PROMPT = """\
-You are an MCQ generator. Always respond with ONLY valid JSON (no markdown, no extra text).
+_SYSTEM_PROMPT = JSON_ONLY_HEADER + """\
+You are an MCQ generator.
 Format:
 {
   "question": "...",
@@ -19,6 +23,24 @@ Format:
   "explanation": "..."
 }"""
 
+_BATCH_SYSTEM_PROMPT = JSON_ONLY_HEADER + """\
+You are an MCQ generator.
+Format:
+{
+  "questions": [
+    {
+      "question": "...",
+      "options": {"A": "...", "B": "...", "C": "...", "D": "..."},
+      "correct": "A",
+      "explanation": "..."
+    }
+  ]
+}"""
+
+# Upper bound on questions per batched call (keeps the response well inside
+# the completion-token budget).
+MAX_BATCH_SIZE = 10
+
 # ── Per-proficiency calibration context ───────────────────────────────────────
 PROFICIENCY_CONTEXT: dict[str, str] = {
     "beginner": (
@@ -41,6 +63,58 @@ PROFICIENCY_CONTEXT: dict[str, str] = {
     ),
 }
 
+# System messages, built once.  Every proficiency calibration rides in them
+# so the cached prompt prefix is shared across students; the user message
+# only names the band to apply.
+_CALIBRATION      = calibration_block("Proficiency calibration", PROFICIENCY_CONTEXT)
+_SYSTEM_MSG       = {"role": "system", "content": _SYSTEM_PROMPT + "\n" + _CALIBRATION}
+_BATCH_SYSTEM_MSG = {"role": "system", "content": _BATCH_SYSTEM_PROMPT + "\n" + _CALIBRATION}
+
+_EMPTY_RESPONSE = "Groq returned an empty response — check API key and model access."
+
+# Shape every served question must have; checked once per reply.
+MCQ_SCHEMA: dict = {
+    "type": "object",
+    "required": ["question", "options", "correct", "explanation"],
+    "properties": {
+        "question":    {"type": "string"},
+        "options":     {"type": "object", "required": ["A", "B", "C", "D"]},
+        "correct":     {"type": "string", "enum": ["A", "B", "C", "D"]},
+        "explanation": {"type": "string"},
+    },
+}
+_validate_mcq = compile_validator(MCQ_SCHEMA, "mcq")
+
+
+def _is_valid_mcq(q: object) -> bool:
+    try:
+        _validate_mcq(q)
+    except ValueError:
+        return False
+    return True
+
+
+# Easy questions below the advanced band are rote recall: the small model
+# writes them as well, several times faster.
+_SMALL_MODEL_TIERS = frozenset({("easy", "beginner"), ("easy", "intermediate")})
+
+
+def _session_prefix(topic: str, proficiency: str) -> str:
+    return session_prefix(
+        topic, calibration_key(proficiency, PROFICIENCY_CONTEXT, "intermediate"))
+
+
+def _mcq_model(difficulty: str, proficiency: str) -> str:
+    band = calibration_key(proficiency, PROFICIENCY_CONTEXT, "intermediate")
+    return MODELS["mcq_easy" if (difficulty, band) in _SMALL_MODEL_TIERS else "mcq"]
+
+
+def _avoid_block(asked_questions: list[str] | None) -> str:
+    if not asked_questions:
+        return ""
+    return "\nDo NOT repeat these questions:\n" + asked_lines(asked_questions)
+
+
 # ── JSON Schema for the tool (used by the LLM orchestrator) ───────────────────
 MCQ_PARAMETERS: dict = {
     "type": "object",
@@ -62,38 +136,27 @@ MCQ_PARAMETERS: dict = {
         "asked_questions": {
             "type": "array",
             "items": {"type": "string"},
-            "description": "List of question texts already asked this session (to avoid repeats).",
+            "description": ("List of question texts already asked this session (to avoid repeats); "
+                            f"only the {ASKED_PROMPT_LIMIT} most recent distinct entries reach the prompt."),
         },
     },
     "required": ["topic", "difficulty"],
 }
 
 
-# ── Private helpers ────────────────────────────────────────────────────────────
-
-def _try_repair_json(text: str) -> dict:
-    """
-    Last-resort JSON repair for truncated model responses.
-    Closes any open string, array, or object and retries json.loads once.
-    """
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        repairable = text.rstrip()
-        while repairable and repairable[-1] in (",", ":", '"'):
-            repairable = repairable[:-1]
-        if repairable.count('"') % 2 == 1:
-            repairable += '"'
-        opens = {"[": "]", "{": "}"}
-        closes = {"]", "}"}
-        stack: list[str] = []
-        for ch in repairable:
-            if ch in opens:
-                stack.append(opens[ch])
-            elif ch in closes and stack:
-                stack.pop()
-        repairable += "".join(reversed(stack))
-        return json.loads(repairable)
+MCQ_BATCH_PARAMETERS: dict = {
+    "type": "object",
+    "properties": {
+        **MCQ_PARAMETERS["properties"],
+        "n": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": MAX_BATCH_SIZE,
+            "description": f"Number of distinct questions to generate (1-{MAX_BATCH_SIZE}).",
+        },
+    },
+    "required": ["topic", "difficulty"],
+}
 
 
 def _generate_mcq(
@@ -102,48 +165,71 @@ def _generate_mcq(
     difficulty: str,
     proficiency: str = "intermediate",
     asked_questions: list[str] | None = None,
+    on_token: TokenCallback | None = None,
 ) -> dict:
-    """Core implementation — calls Groq and returns a validated question dict."""
-    asked_questions = asked_questions or []
-    avoid = ""
-    if asked_questions:
-        avoid = "\nDo NOT repeat these questions:\n" + "\n".join(f"- {q}" for q in asked_questions)
-
-    prof_ctx = PROFICIENCY_CONTEXT.get(proficiency.lower(), PROFICIENCY_CONTEXT["intermediate"])
-
-    user_msg = (
-        f"{prof_ctx}\n\n"
-        f"Generate a {difficulty} difficulty MCQ about: {topic}.{avoid}\n"
-        "Return ONLY the JSON object. Keep the explanation under 30 words."
-    )
+    """
+    Core implementation — calls Groq and returns a validated question dict.
+    With `on_token` the completion is streamed and each delta passed on.
+    """
+    user_msg = "".join((
+        _session_prefix(topic, proficiency),
+        "Generate a ", difficulty, " difficulty MCQ about the topic.",
+        "\nReturn ONLY the JSON object. Keep the explanation under 30 words.",
+        _avoid_block(asked_questions),   # last: it grows every turn
+    ))
 
-    # Non-streaming required: reasoning models route reasoning tokens separately,
-    # which makes streamed delta.content empty.
-    completion = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user",   "content": user_msg},
-        ],
+    # Reasoning tokens arrive separately from delta.content, so a streamed
+    # call only relays the answer JSON once reasoning has finished.
+    # A single MCQ is rote generation: low reasoning effort, and a ceiling
+    # sized for that reasoning plus a ~250-token answer.  A malformed or
+    # truncated question is requested once more with extra room.
+    return complete_validated(
+        groq_client, _validate_mcq, (800, 1400), on_token,
+        empty_error=_EMPTY_RESPONSE,
+        model=_mcq_model(difficulty, proficiency),
+        messages=[_SYSTEM_MSG, {"role": "user", "content": user_msg}],
         temperature=1,
-        max_completion_tokens=1500,
         top_p=1,
-        reasoning_effort="medium",
-        stream=False,
+        reasoning_effort="low",
         stop=None,
     )
 
-    text = (completion.choices[0].message.content or "").strip()
 
-    # Strip markdown fences if model wraps the JSON
-    if text.startswith("```"):
-        parts = text.split("```")
-        text = parts[1].lstrip("json").strip()
-
-    if not text:
-        raise ValueError("Groq returned an empty response — check API key and model access.")
+def _generate_mcq_batch(
+    groq_client,
+    topic: str,
+    difficulty: str,
+    proficiency: str = "intermediate",
+    asked_questions: list[str] | None = None,
+    n: int = 5,
+) -> list[dict]:
+    """
+    Generate `n` distinct MCQs in one Groq call — one round-trip and one
+    prompt evaluation instead of `n`.  Malformed items are dropped.
+    """
+    n = max(1, min(int(n), MAX_BATCH_SIZE))
+    user_msg = "".join((
+        _session_prefix(topic, proficiency),
+        f"Generate {n} distinct ", difficulty, " difficulty MCQs about the topic.",
+        "\nEach question must test a different concept. "
+        "Return ONLY the JSON object. Keep each explanation under 30 words.",
+        _avoid_block(asked_questions),
+    ))
 
-    return _try_repair_json(text)
+    text = complete_text(
+        groq_client,
+        model=_mcq_model(difficulty, proficiency),
+        json_mode=True,
+        messages=[_BATCH_SYSTEM_MSG, {"role": "user", "content": user_msg}],
+        temperature=1,
+        max_completion_tokens=400 + 350 * n,
+        top_p=1,
+        reasoning_effort="low",
+        stop=None,
+    )
+    data = parse_llm_json(text, _EMPTY_RESPONSE)
+    items = data.get("questions", []) if isinstance(data, dict) else data
+    return [q for q in items if _is_valid_mcq(q)]
 
 
 # ── Public factory ─────────────────────────────────────────────────────────────
@@ -160,8 +246,10 @@ def create_mcq_tool(groq_client) -> Tool:
         difficulty: str,
         proficiency: str = "intermediate",
         asked_questions: list[str] | None = None,
+        on_token: TokenCallback | None = None,
     ) -> dict:
-        return _generate_mcq(groq_client, topic, difficulty, proficiency, asked_questions)
+        return _generate_mcq(groq_client, topic, difficulty, proficiency,
+                             asked_questions, on_token)
 
     return Tool(
         name="generate_mcq",
@@ -172,4 +260,33 @@ def create_mcq_tool(groq_client) -> Tool:
         ),
         parameters=MCQ_PARAMETERS,
         func=func,
+        parallel_safe=True,
+    )
+
+
+def create_mcq_batch_tool(groq_client) -> Tool:
+    """
+    Build and return the generate_mcq_batch Tool — the batched variant of
+    generate_mcq, used to pre-warm question pools.
+    """
+    def func(
+        topic: str,
+        difficulty: str,
+        proficiency: str = "intermediate",
+        asked_questions: list[str] | None = None,
+        n: int = 5,
+    ) -> list[dict]:
+        return _generate_mcq_batch(groq_client, topic, difficulty, proficiency,
+                                   asked_questions, n)
+
+    return Tool(
+        name="generate_mcq_batch",
+        description=(
+            "Generate n distinct multiple-choice questions for a topic and difficulty "
+            "level in a single call. Returns a list of dicts with keys: "
+            "question, options (A-D), correct (letter), explanation."
+        ),
+        parameters=MCQ_BATCH_PARAMETERS,
+        func=func,
+        parallel_safe=True,
     )